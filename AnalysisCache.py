@@ -0,0 +1,266 @@
+import json
+import sqlite3
+from collections import OrderedDict
+import numpy as np
+from SymmetryGroup import canonical_form, find_element, apply_elements, undo_elements
+from SudokuSolver import solve_sudoku, flatten_grid
+from DifficultyGrader import grade_puzzle
+
+# Row, column and box of every cell
+CELL_ROW = np.arange(81) // 9
+CELL_COL = np.arange(81) % 9
+CELL_BOX = CELL_ROW // 3 * 3 + CELL_COL // 3
+
+
+def puzzle_signatures(grids) -> list[bytes]:
+    """
+    Compute a cheap invariant of puzzles under the symmetry group, for a whole batch at once.
+
+    Every given is described by the clue counts of its row and column (as an unordered pair, since a
+    transposition swaps them), the clue count of its box and the number of times its digit is given.
+    The sorted list of these descriptions is unchanged by every transformation, so all the variants of
+    a seed share it. Puzzles that are not symmetric to each other can share it too, so it only narrows
+    down the candidates (see AnalysisCache).
+
+    Args:
+    - grids: An (n, 81) array of unsolved grids, or a single flat grid.
+
+    Returns:
+    - list[bytes]: One signature per grid.
+    """
+    grids = np.asarray(grids, dtype=np.uint8).reshape(-1, 81)
+    filled = grids > 0
+    rows = filled.reshape(-1, 9, 9).sum(axis=2)
+    cols = filled.reshape(-1, 9, 9).sum(axis=1)
+    boxes = filled.reshape(-1, 3, 3, 3, 3).sum(axis=(2, 4)).reshape(-1, 9)
+    digit_counts = (grids[:, :, None] == np.arange(10, dtype=np.uint8)).sum(axis=1)
+    given = np.take_along_axis(digit_counts, grids.astype(np.intp), axis=1)
+
+    # One code per given, 0 for empty cells, sorted so the positions of the cells do not matter
+    row_count, col_count = rows[:, CELL_ROW], cols[:, CELL_COL]
+    codes = ((np.minimum(row_count, col_count) * 10 + np.maximum(row_count, col_count)) * 10 + boxes[:, CELL_BOX]) * 10 + given
+    codes = np.where(filled, codes, 0).astype(np.uint16)
+    codes.sort(axis=1)
+    return [row.tobytes() for row in codes]
+
+
+class AnalysisCache:
+    """
+    Memoizes the solution, solution count and difficulty of puzzles.
+
+    Entries are keyed on a cheap invariant of the puzzle (see puzzle_signatures). A signature is
+    not unique to a symmetry class, so each entry lists the classes seen with it, by one analyzed
+    puzzle each, and a hit is only accepted once SymmetryGroup.find_element maps the givens of the
+    puzzle onto one of them (well under a millisecond for real puzzles). The found element also
+    brings that puzzle's solution into the frame of the one asked for, so every variant produced by
+    MakeJson from the same seed is solved and graded once, and the others pay for their signature
+    and the match only. Puzzles matching no listed class are analyzed and added to the entry.
+
+    `exact=True` keys every puzzle on its full canonical form instead (see SymmetryGroup.canonical_form),
+    which costs a few milliseconds per puzzle.
+    Recent entries live in a bounded in-memory LRU; an optional SQLite file keeps them between runs.
+    """
+
+    def __init__(self, maxsize: int = 100_000, path: str | None = None, exact: bool = False):
+        """
+        Args:
+        - maxsize (int): The maximum number of entries kept in memory.
+        - path (str, optional): A SQLite file used as a persistent second level.
+        - exact (bool): Key every puzzle on its canonical form instead of its signature.
+        """
+        self.maxsize = maxsize
+        self.exact = exact
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.database = None
+        if path:
+            self.database = sqlite3.connect(path)
+            self.database.execute("CREATE TABLE IF NOT EXISTS analysis (canonical TEXT PRIMARY KEY, result TEXT NOT NULL)")
+
+    def _lookup(self, key: str) -> dict | None:
+        """
+        Find an entry in memory, then on disk, refreshing its position in the LRU.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.database is not None:
+            row = self.database.execute("SELECT result FROM analysis WHERE canonical = ?", (key,)).fetchone()
+            if row:
+                entry = json.loads(row[0])
+                self._remember(key, entry)
+                return entry
+        return None
+
+    def _remember(self, key: str, entry: dict) -> None:
+        """
+        Add an entry to the in-memory LRU, evicting the least recently used one when full.
+        """
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def _store(self, key: str, entry: dict) -> None:
+        """
+        Add an entry to memory and to the on-disk store.
+        """
+        self._remember(key, entry)
+        if self.database is not None:
+            self.database.execute("INSERT OR REPLACE INTO analysis VALUES (?, ?)", (key, json.dumps(entry)))
+            self.database.commit()
+
+    @staticmethod
+    def _solve_and_grade(digits: str) -> dict:
+        """
+        Run the solver and the grader on one puzzle.
+        """
+        solution, count = solve_sudoku(digits)
+        rating, difficulty = grade_puzzle(digits)
+        return {
+            "solution": flatten_grid(solution) if solution else None,
+            "solutions": count,
+            "rating": rating,
+            "difficulty": difficulty,
+        }
+
+    def _analyze_exact(self, cells: np.ndarray) -> dict:
+        """
+        Analyze a puzzle through the cache entry of its canonical form.
+        """
+        canonical, code = canonical_form(cells)
+        key = "c:" + "".join(map(str, canonical.tolist()))
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+        else:
+            # Cache miss: do the real work once for the whole symmetry class
+            self.misses += 1
+            entry = self._solve_and_grade(key[2:])
+            self._store(key, entry)
+
+        # Bring the canonical solution back into the frame of the puzzle that was asked for
+        solution = None
+        if entry["solution"] is not None:
+            solution = undo_elements([code], np.array(entry["solution"], dtype=np.uint8))[0].reshape(9, 9).tolist()
+        return {"solution": solution, "solutions": entry["solutions"], "rating": entry["rating"], "difficulty": entry["difficulty"]}
+
+    def _analyze_cells(self, cells: np.ndarray, signature: bytes) -> dict:
+        """
+        Analyze one puzzle whose signature is known.
+        """
+        if self.exact:
+            return self._analyze_exact(cells)
+        key = "s:" + signature.hex()
+        digits = (cells + ord("0")).tobytes().decode("ascii")
+        classes = self._lookup(key) or []
+        for entry in classes:
+            if digits == entry["puzzle"]:
+                self.hits += 1
+                return self._result(entry, entry["solution"])
+            code = find_element(cells, np.frombuffer(entry["puzzle"].encode("ascii"), dtype=np.uint8) - ord("0"))
+            if code is not None:
+                # Same class: the element taking the puzzle onto the entry also takes its solution back
+                self.hits += 1
+                solution = None
+                if entry["solution"] is not None:
+                    solution = undo_elements([code], np.array(entry["solution"], dtype=np.uint8))[0]
+                return self._result(entry, solution)
+
+        # A class not seen yet: analyze the puzzle in its own frame and list it under the signature
+        self.misses += 1
+        entry = {**self._solve_and_grade(digits), "puzzle": digits}
+        self._store(key, classes + [entry])
+        return self._result(entry, entry["solution"])
+
+    @staticmethod
+    def _result(entry: dict, solution: list[int] | None) -> dict:
+        """
+        Build the analysis returned to callers from an entry and a flat solution.
+        """
+        return {
+            "solution": np.array(solution, dtype=np.uint8).reshape(9, 9).tolist() if solution is not None else None,
+            "solutions": entry["solutions"],
+            "rating": entry["rating"],
+            "difficulty": entry["difficulty"],
+        }
+
+    @staticmethod
+    def _as_cells(grid) -> np.ndarray:
+        return np.asarray(grid if isinstance(grid, np.ndarray) else flatten_grid(grid), dtype=np.uint8).reshape(81)
+
+    def analyze(self, grid) -> dict:
+        """
+        Analyze one puzzle.
+
+        Args:
+        - grid: The unsolved grid, as a 9x9 list, a string of 81 digits or a flat array.
+
+        Returns:
+        - dict: 'solution' (9x9 list of lists in the frame of `grid`, or None), 'solutions'
+          (0, 1 or 2 for "more than one"), 'rating' and 'difficulty'.
+        """
+        cells = self._as_cells(grid)
+        return self._analyze_cells(cells, puzzle_signatures(cells)[0])
+
+    def analyze_many(self, grids) -> list[dict]:
+        """
+        Analyze a batch of puzzles; the signatures of the whole batch are computed at once.
+
+        Args:
+        - grids: The unsolved grids, as an (n, 81) array or a list of grids accepted by analyze.
+
+        Returns:
+        - list[dict]: One analysis per grid, as returned by analyze.
+        """
+        cells = grids if isinstance(grids, np.ndarray) else np.array([self._as_cells(grid) for grid in grids], dtype=np.uint8)
+        cells = cells.reshape(-1, 81).astype(np.uint8, copy=False)
+        return [self._analyze_cells(grid, signature) for grid, signature in zip(cells, puzzle_signatures(cells))]
+
+    def grade_many(self, grids) -> list[tuple[float, str]]:
+        """
+        Grade a batch of puzzles, as DifficultyGrader.grade_many, without grading again the variants
+        of puzzles already graded.
+
+        Args:
+        - grids: The unsolved grids, as an (n, 81) array or a list of grids accepted by analyze.
+
+        Returns:
+        - list[tuple]: One (rating, difficulty) pair per grid.
+        """
+        cells = grids if isinstance(grids, np.ndarray) else np.array([self._as_cells(grid) for grid in grids], dtype=np.uint8)
+        cells = cells.reshape(-1, 81).astype(np.uint8, copy=False)
+        grades = []
+        for grid, signature in zip(cells, puzzle_signatures(cells)):
+            analysis = self._analyze_cells(grid, signature)
+            grades.append((analysis["rating"], analysis["difficulty"]))
+        return grades
+
+    def analyze_variants(self, seed_grid, elements: np.ndarray) -> dict:
+        """
+        Analyze every variant of a seed produced by known group elements, e.g. the elements passed to
+        MakeJson.generate_matching_batch. Only the seed is analyzed; the variants' solutions are
+        obtained with one vectorized transformation of the seed's solution.
+
+        Args:
+        - seed_grid: The unsolved seed grid, as a 9x9 list, a string of 81 digits or a flat array.
+        - elements (np.ndarray): The (n,) group element codes that produced the variants.
+
+        Returns:
+        - dict: 'solutions' (an (n, 81) uint8 array with the solution of every variant, or None),
+          'solution_count', 'rating' and 'difficulty' (shared by all variants).
+        """
+        analysis = self.analyze(seed_grid)
+        solutions = None
+        if analysis["solution"] is not None:
+            solutions = apply_elements(elements, np.array(analysis["solution"], dtype=np.uint8).ravel())
+        return {"solutions": solutions, "solution_count": analysis["solutions"], "rating": analysis["rating"], "difficulty": analysis["difficulty"]}
+
+    def close(self) -> None:
+        """
+        Close the on-disk store, if any.
+        """
+        if self.database is not None:
+            self.database.close()
+            self.database = None
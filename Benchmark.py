@@ -0,0 +1,447 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from Instrumentation import REPORT_DIRECTORY
+
+# Directory of the benchmark, so the project modules and seed files are found from any working directory
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Batch sizes measured by default
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+# Change in throughput above which compare reports a regression (10%)
+REGRESSION_THRESHOLD = 0.10
+
+# Entry points whose import time is measured by 'startup'
+STARTUP_MODULES = ["Main", "MakeJson", "RunBatch", "PuzzleGenerator"]
+
+# Libraries only the Excel and Parquet exports need; importing them at startup is a regression
+HEAVY_MODULES = ["pandas", "openpyxl", "pyarrow"]
+
+# Measured in a fresh interpreter: import time of one module and the heavy libraries it pulled in
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{"import_s": time.perf_counter() - started,
+                  "heavy_modules": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def load_example_seed() -> tuple[list[list[int]], list[list[int]]]:
+    """
+    Read the seed puzzle of Example.txt (the lines after 'Unsolved String:' and 'Solved String:').
+
+    Returns:
+    - tuple: The solved and unsolved grids as 9x9 lists of integers.
+    """
+    with open(os.path.join(PROJECT_DIR, "Example.txt"), "r", encoding="utf-8") as file:
+        lines = [line.strip() for line in file]
+    grids = {}
+    for label, line in zip(lines, lines[1:]):
+        if label in ("Unsolved String:", "Solved String:") and len(line) == 81:
+            grids[label.split()[0]] = [[int(cell) for cell in line[i:i+9]] for i in range(0, 81, 9)]
+    return grids["Solved"], grids["Unsolved"]
+
+
+def write_source_file(n: int, filename: str, rng: np.random.Generator) -> None:
+    """
+    Write n puzzles from the example seed to a newboard.grids JSON file, as MakeJson does.
+    """
+    from MakeJson import iter_matching_batches, write_grids_stream
+    solved, unsolved = load_example_seed()
+    write_grids_stream(iter_matching_batches(solved, unsolved, n, rng=rng), filename, "Easy")
+
+
+# Every stage takes (n, rng), does its setup untimed and returns the function to time.
+# The stages run in the benchmark's scratch directory.
+
+def stage_generate_random_grids(n: int, rng: np.random.Generator):
+    from MakeJson import generate_random_grids
+    from NumberToLetter import FromNumberToLetter
+    unsolved, solved = FromNumberToLetter(list(load_example_seed())[::-1])
+
+    def run():
+        for _ in range(n):
+            generate_random_grids(solved, unsolved)
+    return run
+
+
+def stage_generate_matching_batch(n: int, rng: np.random.Generator):
+    from MakeJson import iter_matching_batches
+    solved, unsolved = load_example_seed()
+
+    def run():
+        for _ in iter_matching_batches(solved, unsolved, n, rng=rng):
+            pass
+    return run
+
+
+def pattern_seed(box: int, rng: np.random.Generator) -> tuple[list[list[int]], list[list[int]]]:
+    """
+    Build a solved grid of any size from the standard band pattern, and a puzzle keeping half of its cells.
+    """
+    side = box * box
+    solved = [[(box * (row % box) + row // box + column) % side + 1 for column in range(side)] for row in range(side)]
+    unsolved = [[value if rng.random() < 0.5 else 0 for value in row] for row in solved]
+    return solved, unsolved
+
+
+def sized_generation_stage(box: int):
+    """
+    Build the generate_matching_batch stage of another grid size, to compare its throughput per cell with 9x9.
+    """
+    def stage(n: int, rng: np.random.Generator):
+        from MakeJson import iter_matching_batches
+        solved, unsolved = pattern_seed(box, rng)
+
+        def run():
+            for _ in iter_matching_batches(solved, unsolved, n, rng=rng):
+                pass
+        return run
+    return stage
+
+
+def stage_from_number_to_letter(n: int, rng: np.random.Generator):
+    from MakeJson import generate_matching_grids
+    from NumberToLetter import FromNumberToLetter
+    solved, unsolved = load_example_seed()
+    grids, _ = generate_matching_grids(solved, unsolved, n)
+
+    def run():
+        FromNumberToLetter(grids)
+    return run
+
+
+def stage_make_json(n: int, rng: np.random.Generator):
+    def run():
+        write_source_file(n, "SudokuList1.json", rng)
+    return run
+
+
+def stage_make_jsonl(n: int, rng: np.random.Generator):
+    from MakeJson import iter_matching_batches, write_grids_stream
+    solved, unsolved = load_example_seed()
+
+    def run():
+        write_grids_stream(iter_matching_batches(solved, unsolved, n, rng=rng), "SudokuList1.jsonl", "Easy", "jsonl")
+    return run
+
+
+def stage_process_sudoku_puzzles(n: int, rng: np.random.Generator):
+    from MakeSingleExcel import process_sudoku_puzzles
+    write_source_file(n, "SudokuList1.json", rng)
+
+    def run():
+        process_sudoku_puzzles("SudokuList1.json")
+    return run
+
+
+def stage_merge_sudoku_files_by_difficulty(n: int, rng: np.random.Generator):
+    from MakeSingleExcel import process_sudoku_puzzles
+    from MakeBigExcel import merge_sudoku_files_by_difficulty
+    write_source_file(n, "SudokuList1.json", rng)
+    process_sudoku_puzzles("SudokuList1.json")
+    os.remove("SudokuList1.json")
+
+    def run():
+        merge_sudoku_files_by_difficulty(".")
+    return run
+
+
+def stage_export_excel_by_difficulty(n: int, rng: np.random.Generator):
+    from MakeStreamExcel import export_excel_by_difficulty
+    write_source_file(n, "SudokuList1.json", rng)
+
+    def run():
+        export_excel_by_difficulty(["SudokuList1.json"], ".")
+    return run
+
+
+STAGES = {
+    "generate_random_grids": stage_generate_random_grids,
+    "generate_matching_batch": stage_generate_matching_batch,
+    "generate_matching_batch_16x16": sized_generation_stage(4),
+    "generate_matching_batch_25x25": sized_generation_stage(5),
+    "from_number_to_letter": stage_from_number_to_letter,
+    "make_json": stage_make_json,
+    "make_jsonl": stage_make_jsonl,
+    "process_sudoku_puzzles": stage_process_sudoku_puzzles,
+    "merge_sudoku_files_by_difficulty": stage_merge_sudoku_files_by_difficulty,
+    "export_excel_by_difficulty": stage_export_excel_by_difficulty,
+}
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident memory of the current process, in MiB (ru_maxrss is in KiB on Linux).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_stage(stage: str, n: int, seed: int) -> dict:
+    """
+    Run one stage once in the current process, inside a scratch directory.
+
+    Args:
+    - stage (str): The name of the stage (one of STAGES).
+    - n (int): The number of puzzles.
+    - seed (int): The random seed (seeds both random and NumPy).
+
+    Returns:
+    - dict: 'wall_s', 'puzzles_per_s', 'setup_rss_mb' (peak memory before the timed part)
+      and 'peak_rss_mb' (peak memory of the whole run).
+    """
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    scratch = tempfile.mkdtemp(prefix="sudoku-bench-")
+    previous = os.getcwd()
+    os.chdir(scratch)
+    try:
+        # Silence the progress prints of the stages, they would dominate the timing
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                run = STAGES[stage](n, rng)
+                setup_rss = peak_rss_mb()
+                started = time.perf_counter()
+                run()
+                wall = time.perf_counter() - started
+            finally:
+                sys.stdout = stdout
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {
+        "wall_s": round(wall, 4),
+        "puzzles_per_s": round(n / wall, 1) if wall else None,
+        "setup_rss_mb": round(setup_rss, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def measure(stage: str, n: int, seed: int, timeout: float | None) -> dict:
+    """
+    Run one stage in a fresh interpreter, so peak memory is measured for that stage alone.
+
+    Returns:
+    - dict: The result of run_stage with 'stage', 'size' and 'status' ('ok', 'timeout' or 'error').
+    """
+    entry = {"stage": stage, "size": n}
+    command = [sys.executable, os.path.abspath(__file__), "run-one", stage, str(n), "--seed", str(seed)]
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_DIR, os.environ.get("PYTHONPATH")])))
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, timeout=timeout, env=environment)
+    except subprocess.TimeoutExpired:
+        return {**entry, "status": "timeout"}
+    if process.returncode != 0:
+        return {**entry, "status": "error", "error": process.stderr.strip().splitlines()[-1:]}
+    return {**entry, "status": "ok", **json.loads(process.stdout.strip().splitlines()[-1])}
+
+
+def measure_startup(module: str) -> dict:
+    """
+    Import one module in a fresh interpreter, timing the whole process and the import alone.
+
+    Returns:
+    - dict: 'stage' ('startup:<module>'), 'size' (0), 'status' ('ok', 'heavy_import' or 'error'),
+      'wall_s' (process), 'import_s' and 'heavy_modules' (the heavy libraries that were imported).
+    """
+    entry = {"stage": f"startup:{module}", "size": 0}
+    command = [sys.executable, "-c", STARTUP_PROBE.format(module=module, heavy=HEAVY_MODULES)]
+    started = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True, cwd=PROJECT_DIR)
+    wall = time.perf_counter() - started
+    if process.returncode != 0:
+        return {**entry, "status": "error", "error": process.stderr.strip().splitlines()[-1:]}
+    probe = json.loads(process.stdout.strip().splitlines()[-1])
+    return {
+        **entry,
+        "status": "heavy_import" if probe["heavy_modules"] else "ok",
+        "wall_s": round(wall, 4),
+        "import_s": round(probe["import_s"], 4),
+        "heavy_modules": probe["heavy_modules"],
+    }
+
+
+def run_startup(modules: list[str], repeat: int = 5, output: str | None = None) -> dict:
+    """
+    Measure the startup time of the entry points, and check that none of them imports the heavy
+    export libraries (pandas, openpyxl, pyarrow) before they are needed.
+
+    Args:
+    - modules (list[str]): The modules to import.
+    - repeat (int): Runs per module; the fastest run is kept.
+    - output (str, optional): The JSON file receiving the results (same layout as 'run').
+
+    Returns:
+    - dict: 'machine', 'created' and 'results' (one entry per module).
+    """
+    report = {"machine": machine_info(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": []}
+    for module in modules:
+        runs = [measure_startup(module) for _ in range(repeat)]
+        timed = [entry for entry in runs if "wall_s" in entry]
+        best = min(timed, key=lambda entry: entry["wall_s"]) if timed else runs[0]
+        report["results"].append(best)
+        if "wall_s" in best:
+            heavy = f"  imports {', '.join(best['heavy_modules'])}" if best["heavy_modules"] else ""
+            print(f"{best['stage']:<34}{best['wall_s']:>10.3f} s  (import {best['import_s']:.3f} s){heavy}")
+        else:
+            print(f"{best['stage']:<34}  {best['status']}")
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
+        print(f"Results saved to {output}.")
+    return report
+
+
+def machine_info() -> dict:
+    """
+    Describe the machine and software versions, stored with the results.
+    """
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(stages: list[str], sizes: list[int], seed: int = 0, repeat: int = 1,
+                   timeout: float | None = None, output: str | None = None) -> dict:
+    """
+    Measure every stage at every batch size.
+
+    Args:
+    - stages (list[str]): The stages to run.
+    - sizes (list[int]): The batch sizes.
+    - seed (int): The random seed, fixed so runs are comparable.
+    - repeat (int): Runs per measurement; the fastest run is kept.
+    - timeout (float, optional): Seconds after which a run is stopped and recorded as a timeout.
+      Larger sizes of that stage are skipped.
+    - output (str, optional): The JSON file receiving the results.
+
+    Returns:
+    - dict: 'machine', 'seed', 'created' and 'results' (one entry per stage and size).
+    """
+    report = {"machine": machine_info(), "seed": seed, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": []}
+    for stage in stages:
+        for n in sorted(sizes):
+            runs = [measure(stage, n, seed, timeout) for _ in range(repeat)]
+            ok = [entry for entry in runs if entry["status"] == "ok"]
+            best = min(ok, key=lambda entry: entry["wall_s"]) if ok else runs[0]
+            report["results"].append(best)
+            print(format_result(best))
+            if best["status"] != "ok":
+                break  # Larger sizes would only take longer
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
+        print(f"Results saved to {output}.")
+    return report
+
+
+def format_result(entry: dict) -> str:
+    """
+    One line of text for a result entry.
+    """
+    head = f"{entry['stage']:<34}{entry['size']:>10,}"
+    if entry["status"] != "ok":
+        return f"{head}  {entry['status']}"
+    return f"{head}  {entry['wall_s']:>10.3f} s  {entry['puzzles_per_s']:>14,.0f} puzzles/s  {entry['peak_rss_mb']:>9.1f} MiB"
+
+
+def compare_reports(baseline_file: str, current_file: str, threshold: float = REGRESSION_THRESHOLD) -> bool:
+    """
+    Compare two result files, stage by stage and size by size.
+
+    Args:
+    - baseline_file (str): The reference results.
+    - current_file (str): The new results.
+    - threshold (float): Relative throughput loss reported as a regression.
+
+    Returns:
+    - bool: True when no measurement regressed.
+    """
+    with open(baseline_file, "r", encoding="utf-8") as file:
+        baseline = {(entry["stage"], entry["size"]): entry for entry in json.load(file)["results"]}
+    with open(current_file, "r", encoding="utf-8") as file:
+        current = json.load(file)["results"]
+
+    clean = True
+    print(f"{'stage':<34}{'size':>10}  {'throughput':>11}  {'peak RSS':>9}")
+    for entry in current:
+        reference = baseline.get((entry["stage"], entry["size"]))
+        if reference is None or reference["status"] != "ok" or entry["status"] != "ok":
+            continue  # Nothing to compare against
+        if entry.get("puzzles_per_s"):
+            speed = entry["puzzles_per_s"] / reference["puzzles_per_s"] - 1
+            memory = f"{entry['peak_rss_mb'] / reference['peak_rss_mb'] - 1:>+8.1%}"
+        else:
+            # Startup entries: the speed is the inverse of the wall time
+            speed = reference["wall_s"] / entry["wall_s"] - 1
+            memory = f"{'-':>8}"
+        regressed = speed < -threshold
+        clean &= not regressed
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{entry['stage']:<34}{entry['size']:>10,}  {speed:>+10.1%}  {memory}{flag}")
+    return clean
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the stages of the Sudoku pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Measure the stages and save the results.")
+    run_parser.add_argument("-s", "--stages", default=",".join(STAGES), help="Comma-separated stages to run.")
+    run_parser.add_argument("-n", "--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Comma-separated batch sizes.")
+    run_parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    run_parser.add_argument("--repeat", type=int, default=1, help="Runs per measurement (the fastest is kept).")
+    run_parser.add_argument("--timeout", type=float, default=None, help="Seconds before a run is stopped.")
+    run_parser.add_argument("-o", "--output", default=os.path.join(REPORT_DIRECTORY, "benchmark_results.json"), help="Results file.")
+
+    compare_parser = commands.add_parser("compare", help="Compare two results files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Throughput loss counted as a regression.")
+
+    startup_parser = commands.add_parser("startup", help="Measure the import time of the entry points.")
+    startup_parser.add_argument("-m", "--modules", default=",".join(STARTUP_MODULES), help="Comma-separated modules.")
+    startup_parser.add_argument("--repeat", type=int, default=5, help="Runs per module (the fastest is kept).")
+    startup_parser.add_argument("-o", "--output", default=os.path.join(REPORT_DIRECTORY, "startup_results.json"), help="Results file.")
+
+    one_parser = commands.add_parser("run-one", help=argparse.SUPPRESS)
+    one_parser.add_argument("stage", choices=list(STAGES))
+    one_parser.add_argument("size", type=int)
+    one_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        sizes = [int(size) for size in args.sizes.split(",")]
+        run_benchmarks(args.stages.split(","), sizes, args.seed, args.repeat, args.timeout, args.output)
+    elif args.command == "startup":
+        report = run_startup(args.modules.split(","), args.repeat, args.output)
+        # A heavy library imported at startup fails the check, like a throughput regression
+        if any(entry["status"] != "ok" for entry in report["results"]):
+            sys.exit(1)
+    elif args.command == "compare":
+        if not compare_reports(args.baseline, args.current, args.threshold):
+            sys.exit(1)
+    else:
+        print(json.dumps(run_stage(args.stage, args.size, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
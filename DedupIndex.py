@@ -0,0 +1,211 @@
+import os
+import numpy as np
+from SymmetryGroup import canonical_form
+
+# splitmix64 constants, used to turn packed grids into well-mixed 64-bit fingerprints
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """
+    splitmix64 finalizer, applied element-wise to a uint64 array.
+    """
+    values = values + GOLDEN
+    values = (values ^ (values >> np.uint64(30))) * MIX_1
+    values = (values ^ (values >> np.uint64(27))) * MIX_2
+    return values ^ (values >> np.uint64(31))
+
+
+def flat_grids(grids) -> np.ndarray:
+    """
+    Turn one grid or a batch of grids of any size into an (n, side^2) uint8 array.
+    """
+    grids = np.asarray(grids, dtype=np.uint8)
+    return grids.reshape(1, -1) if grids.ndim == 1 else grids.reshape(len(grids), -1)
+
+
+def fingerprints(grids: np.ndarray, salt: int = 0) -> np.ndarray:
+    """
+    Hash a batch of grids to 64-bit fingerprints.
+
+    The 81 cells of a 9x9 grid are packed as nibbles into six 64-bit words, which are then folded
+    through splitmix64. Larger grids take one byte per cell, and their cell count is part of the
+    starting value, so grids of different sizes never share a key.
+
+    Args:
+    - grids (np.ndarray): An (n, side^2) array of grids (values up to 25).
+    - salt (int): Changes the hash function, to get independent fingerprints of the same grids.
+
+    Returns:
+    - np.ndarray: An (n,) uint64 array.
+    """
+    grids = flat_grids(grids)
+    cells = grids.shape[1]
+    if cells == 81:
+        padded = np.zeros((len(grids), 96), dtype=np.uint8)
+        padded[:, :81] = grids
+        # Two cells per byte, eight bytes per word
+        words = (padded[:, 0::2] | (padded[:, 1::2] << 4)).copy().view("<u8")
+        start = salt
+    else:
+        padded = np.zeros((len(grids), -(-cells // 8) * 8), dtype=np.uint8)
+        padded[:, :cells] = grids
+        words = padded.view("<u8")
+        start = salt ^ (cells << 32)
+    with np.errstate(over="ignore"):
+        hashes = np.full(len(grids), start, dtype=np.uint64)
+        for word in range(words.shape[1]):
+            hashes = _mix(hashes ^ words[:, word])
+    return hashes
+
+
+def canonical_grids(grids: np.ndarray) -> np.ndarray:
+    """
+    Replace every grid by its canonical form under the Sudoku symmetry group (see SymmetryGroup.canonical_form).
+
+    Args:
+    - grids (np.ndarray): An (n, 81) array of grids.
+
+    Returns:
+    - np.ndarray: An (n, 81) uint8 array of canonical grids.
+    """
+    return np.array([canonical_form(grid)[0] for grid in np.asarray(grids).reshape(-1, 81)], dtype=np.uint8).reshape(-1, 81)
+
+
+class DedupIndex:
+    """
+    Index of the puzzles already emitted, used to drop duplicates on the fly.
+
+    Two key modes:
+    - 'exact': a puzzle is a duplicate when the same givens were already seen. This is the mode for
+      generated variants, which are all symmetric to their seed and must not be collapsed.
+    - 'canonical': a puzzle is a duplicate when any symmetric copy was already seen. This is the mode
+      for seeds, e.g. to stop the same seed entering the library twice under a different disguise.
+      Canonicalization costs a few milliseconds per puzzle.
+
+    Two storage tiers:
+    - 'set': sorted 64-bit fingerprints (8 bytes per puzzle); exact up to fingerprint collisions,
+      which stay unlikely (below 1 in 3,000) up to a hundred million puzzles.
+    - 'bloom': a fixed-size Bloom filter, so memory does not grow with the library; a small share of
+      new puzzles (about 1% with 10 bits per expected puzzle) is wrongly treated as duplicates.
+    """
+
+    def __init__(self, path: str | None = None, mode: str = "exact", tier: str = "set",
+                 expected: int = 10_000_000, bits_per_puzzle: int = 10):
+        """
+        Args:
+        - path (str, optional): A .npz file the index is loaded from and saved to.
+        - mode (str): 'exact' or 'canonical' keys.
+        - tier (str): 'set' or 'bloom' storage.
+        - expected (int): Expected number of puzzles (sizes the Bloom filter).
+        - bits_per_puzzle (int): Bloom filter bits per expected puzzle.
+        """
+        self.path = path
+        self.mode = mode
+        self.tier = tier
+        self.keys = np.empty(0, dtype=np.uint64)  # Sorted fingerprints ('set' tier)
+        self.recent = np.empty(0, dtype=np.uint64)  # Sorted fingerprints not merged into keys yet
+        self.bits = np.zeros(-(-expected * bits_per_puzzle // 8), dtype=np.uint8) if tier == "bloom" else None
+        self.hash_count = max(1, round(bits_per_puzzle * 0.693))
+        if path and os.path.exists(path):
+            saved = np.load(path)
+            self.mode, self.tier = str(saved["mode"]), str(saved["tier"])
+            if self.tier == "bloom":
+                self.bits = saved["bits"]
+                self.hash_count = int(saved["hash_count"])
+            else:
+                self.keys = saved["keys"]
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.recent)
+
+    def _bloom_positions(self, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+        """
+        Bit positions of every key in the Bloom filter (double hashing: first + i * second).
+        """
+        size = np.uint64(len(self.bits) * 8)
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (first[:, None] + steps[None, :] * (second[:, None] | np.uint64(1))) % size
+
+    def check_and_add(self, grids: np.ndarray) -> np.ndarray:
+        """
+        Find which grids are new, and add them to the index.
+
+        Args:
+        - grids (np.ndarray): An (n, side^2) array of unsolved grids.
+
+        Returns:
+        - np.ndarray: An (n,) boolean mask, True for grids never seen before (counting earlier
+          grids of the same batch).
+
+        Raises:
+        - ValueError: For canonical keys of grids other than 9x9 (the symmetry group only covers 9x9 grids).
+        """
+        grids = flat_grids(grids)
+        if self.mode == "canonical":
+            if grids.shape[1] != 81:
+                raise ValueError("Canonical keys are only available for 9x9 grids.")
+            grids = canonical_grids(grids)
+        keys = fingerprints(grids)
+
+        # Keep only the first occurrence of each key inside the batch
+        _, first_index = np.unique(keys, return_index=True)
+        fresh = np.zeros(len(keys), dtype=bool)
+        fresh[first_index] = True
+
+        if self.tier == "bloom":
+            positions = self._bloom_positions(keys, fingerprints(grids, salt=1))
+            present = ((self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1).all(axis=1)
+            fresh &= ~present
+            new_positions = positions[fresh].ravel()
+            np.bitwise_or.at(self.bits, new_positions >> np.uint64(3), (1 << (new_positions & np.uint64(7))).astype(np.uint8))
+            return fresh
+
+        # Set tier: binary search in both sorted arrays
+        for known in (self.keys, self.recent):
+            if len(known):
+                slots = np.minimum(np.searchsorted(known, keys), len(known) - 1)
+                fresh &= known[slots] != keys
+        # The fresh keys are distinct and not indexed yet, so a sorted concatenation is a union
+        self.recent = np.sort(np.concatenate([self.recent, keys[fresh]]))
+
+        # Merge the recent keys into the main array once they are a sizeable fraction of it
+        if len(self.recent) * 8 > len(self.keys):
+            self.keys = np.sort(np.concatenate([self.keys, self.recent]))
+            self.recent = np.empty(0, dtype=np.uint64)
+        return fresh
+
+    def save(self) -> None:
+        """
+        Save the index to its .npz file (written to a temporary file, then renamed).
+        """
+        if not self.path:
+            return
+        temporary = f"{self.path}.tmp.npz"
+        if self.tier == "bloom":
+            np.savez(temporary, mode=self.mode, tier=self.tier, bits=self.bits, hash_count=self.hash_count)
+        else:
+            np.savez(temporary, mode=self.mode, tier=self.tier, keys=np.sort(np.concatenate([self.keys, self.recent])))
+        os.replace(temporary, self.path)
+
+
+def drop_duplicates(batches, index: DedupIndex):
+    """
+    Filter a stream of puzzle batches through a dedup index.
+
+    Args:
+    - batches (iterable): (solved, unsolved) pairs or (solved, unsolved, difficulty) triples of (k, side^2) arrays.
+    - index (DedupIndex): The index of puzzles already emitted; kept puzzles are added to it.
+
+    Yields:
+    - tuple: The same batches without the duplicate puzzles (empty batches are skipped).
+    """
+    for batch in batches:
+        fresh = index.check_and_add(batch[1])
+        if fresh.all():
+            yield batch
+        elif fresh.any():
+            yield (batch[0][fresh], batch[1][fresh], *batch[2:])
@@ -0,0 +1,148 @@
+import numpy as np
+from GridParser import parse_cells
+
+# bytes.translate tables between cell values (0-9) and their digit characters
+TO_DIGITS = bytes(range(256)).replace(bytes(range(10)), b"0123456789")
+LETTERS = dict(zip("ABCDEFGHI", range(1, 10)))
+
+
+def relabel_table(mapping) -> bytes:
+    """
+    Build the bytes.translate table of a digit relabeling.
+
+    Args:
+    - mapping: The new value of every digit, either a sequence indexed by the old digit (10 values,
+      mapping[0] == 0 for empty cells, or 9 values for digits 1-9) or a dict {old: new}.
+
+    Returns:
+    - bytes: A 256-byte table; empty cells always stay empty.
+    """
+    if isinstance(mapping, dict):
+        values = [0] + [mapping.get(digit, digit) for digit in range(1, 10)]
+    else:
+        values = [0] + list(mapping)[-9:]
+    return bytes(values) + bytes(range(10, 256))
+
+
+class Grid:
+    """
+    A Sudoku grid stored as 81 bytes (one cell value 0-9 per byte, row by row, 0 for empty cells).
+
+    The grid is immutable and hashable; its NumPy array view shares the bytes, and the string and
+    2D list forms are produced on demand. Iterating over a grid yields its rows (as bytes, which
+    iterate as integers), so code written for 9x9 lists keeps working.
+    """
+
+    __slots__ = ("cells",)
+
+    def __init__(self, cells: bytes):
+        """
+        Args:
+        - cells (bytes): The 81 cell values.
+        """
+        cells = bytes(cells)
+        if len(cells) != 81 or max(cells) > 9:
+            raise ValueError("A grid needs 81 cells with values from 0 to 9.")
+        self.cells = cells
+
+    @classmethod
+    def from_rows(cls, rows) -> "Grid":
+        """
+        Build a grid from 9x9 rows of integers (or of letters A-I, as written by FromNumberToLetter).
+        """
+        return cls(bytes(LETTERS.get(cell, 0) if isinstance(cell, str) and not cell.isdigit() else int(cell)
+                         for row in rows for cell in row))
+
+    @classmethod
+    def from_string(cls, text: str) -> "Grid":
+        """
+        Build a grid from any text accepted by GridParser.parse_cells (81 digits, '.' blanks, bracketed lists).
+        """
+        return cls(parse_cells(text).tobytes())
+
+    @classmethod
+    def from_array(cls, array) -> "Grid":
+        """
+        Build a grid from an array of 81 cells (any shape).
+        """
+        return cls(np.asarray(array, dtype=np.uint8).tobytes())
+
+    @classmethod
+    def coerce(cls, value) -> "Grid":
+        """
+        Convert a grid in any of the pipeline's representations (Grid, text, 9x9 list, array) to a Grid.
+        """
+        if isinstance(value, Grid):
+            return value
+        if isinstance(value, str):
+            return cls.from_string(value)
+        if isinstance(value, np.ndarray):
+            return cls.from_array(value)
+        return cls.from_rows(value)
+
+    @property
+    def array(self) -> np.ndarray:
+        """
+        Read-only (81,) uint8 view of the cells (no copy).
+        """
+        return np.frombuffer(self.cells, dtype=np.uint8)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        array = self.array.reshape(9, 9)
+        return array.astype(dtype) if dtype is not None else array
+
+    @property
+    def string(self) -> str:
+        """
+        The 81 digits, '0' for empty cells.
+        """
+        return self.cells.translate(TO_DIGITS).decode("ascii")
+
+    def rows(self) -> list[list[int]]:
+        """
+        The grid as a 9x9 list of lists.
+        """
+        return [list(self.cells[i:i + 9]) for i in range(0, 81, 9)]
+
+    def relabel(self, mapping) -> "Grid":
+        """
+        Relabel the digits through a lookup table (see relabel_table).
+        """
+        table = mapping if isinstance(mapping, bytes) else relabel_table(mapping)
+        return Grid(self.cells.translate(table))
+
+    @property
+    def clues(self) -> int:
+        """
+        The number of filled cells.
+        """
+        return 81 - self.cells.count(0)
+
+    def __iter__(self):
+        return (self.cells[i:i + 9] for i in range(0, 81, 9))
+
+    def __len__(self) -> int:
+        return 9
+
+    def __getitem__(self, index):
+        # grid[r] is a row, grid[r, c] a cell
+        if isinstance(index, tuple):
+            row, col = index
+            return self.cells[row * 9 + col]
+        return list(self.cells[index * 9:index * 9 + 9])
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Grid) and self.cells == other.cells
+
+    def __hash__(self) -> int:
+        return hash(self.cells)
+
+    def __repr__(self) -> str:
+        return f"Grid('{self.string}')"
+
+    def __str__(self) -> str:
+        # Same text as str() of the 9x9 list, which is how the workbooks store grids
+        return str(self.rows())
+
+    def __reduce__(self):
+        return Grid, (self.cells,)
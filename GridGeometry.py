@@ -0,0 +1,162 @@
+import math
+from functools import lru_cache
+import numpy as np
+
+# Sizes of the grids handled by the generalized pipeline: box 2 (4x4), 3 (9x9), 4 (16x16) and 5 (25x25)
+MIN_BOX = 2
+MAX_BOX = 5
+
+# Text symbol of every cell value: '0' (or '.') for an empty cell, digits 1-9, then letters for 10-25
+# (a 16x16 grid uses 1-9 and A-G, a 25x25 grid 1-9 and A-P)
+SYMBOLS = "0123456789ABCDEFGHIJKLMNOP"
+
+# Letters of the letter form of a grid (see NumberToLetter): A for 1, B for 2, ... Y for 25
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXY"
+
+# Marker of a byte that is not a symbol of the grid size, in the tables of cell_values
+INVALID = 255
+
+
+def check_box(box: int) -> int:
+    """
+    Check that a box size is supported.
+
+    Args:
+    - box (int): The box size (3 for 9x9 grids).
+
+    Returns:
+    - int: The box size.
+
+    Raises:
+    - ValueError: If the size is not supported.
+    """
+    if not MIN_BOX <= box <= MAX_BOX:
+        raise ValueError(f"Box size must be between {MIN_BOX} and {MAX_BOX}, got {box}.")
+    return box
+
+
+def box_for_cells(cells: int) -> int:
+    """
+    Find the box size of a grid from its number of cells (81 -> 3, 256 -> 4, 625 -> 5).
+
+    Args:
+    - cells (int): The number of cells of the grid.
+
+    Returns:
+    - int: The box size.
+
+    Raises:
+    - ValueError: If no supported grid has that many cells.
+    """
+    box = math.isqrt(math.isqrt(cells))
+    if box ** 4 != cells:
+        raise ValueError(f"A grid needs box^4 cells (16, 81, 256 or 625), got {cells}.")
+    return check_box(box)
+
+
+@lru_cache(maxsize=None)
+def transpose_index(box: int) -> np.ndarray:
+    """
+    Build (once per size) the cell permutations of the identity and of the transposition.
+
+    Returns:
+    - np.ndarray: A (2, side^2) array; row t gives the flat source index of every cell after an optional transposition.
+    """
+    side = check_box(box) ** 2
+    cells = np.arange(side * side)
+    return np.stack([cells, cells.reshape(side, side).T.ravel()])
+
+
+@lru_cache(maxsize=None)
+def cell_values(box: int) -> np.ndarray:
+    """
+    Build (once per size) the byte -> cell value table of the text form of a grid.
+
+    The symbols of the size are themselves ('A' is 10), lowercase letters are accepted, '0' and '.'
+    are empty cells and every other byte is INVALID.
+
+    Returns:
+    - np.ndarray: A (256,) uint8 lookup table.
+    """
+    side = check_box(box) ** 2
+    table = np.full(256, INVALID, dtype=np.uint8)
+    for value, symbol in enumerate(SYMBOLS[:side + 1]):
+        table[ord(symbol)] = table[ord(symbol.lower())] = value
+    table[ord(".")] = 0
+    return table
+
+
+@lru_cache(maxsize=None)
+def symbol_table(box: int) -> bytes:
+    """
+    Build (once per size) the bytes.translate table turning cell values into their text symbols.
+    """
+    side = check_box(box) ** 2
+    return SYMBOLS[:side + 1].encode("ascii") + bytes(range(side + 1, 256))
+
+
+def random_line_orders(rng: np.random.Generator, n: int, box: int) -> np.ndarray:
+    """
+    Draw n random row (or column) arrangements allowed inside a grid: an order of the bands
+    and an independent order of the lines inside every band.
+
+    Every order is the argsort of random keys, so the whole batch is drawn with array operations
+    at any size (the 9x9 path enumerates its 1296 arrangements instead, see SymmetryGroup).
+
+    Returns:
+    - np.ndarray: An (n, side) array; row i lists, for each final line, the source line it comes from.
+    """
+    band_order = rng.random((n, box)).argsort(axis=1)
+    inner_orders = rng.random((n, box, box)).argsort(axis=2)
+    # Final line r sits in final band r // box, which comes from source band band_order[r // box]
+    # and takes the line given by its own inner order
+    lines = np.arange(box * box)
+    return box * band_order[:, lines // box] + inner_orders[:, lines // box, lines % box]
+
+
+def random_transforms(rng: np.random.Generator, n: int, box: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Draw n random validity-preserving transformations of a grid of the given size: a relabeling of
+    the values, an optional transposition, and a row and a column arrangement.
+
+    Args:
+    - rng (np.random.Generator): The random generator to draw from.
+    - n (int): The number of transformations.
+    - box (int): The box size.
+
+    Returns:
+    - tuple: An (n, side^2) array of cell indices (transformed[i] = grid[indices[i]]) and an
+      (n, side + 1) uint8 array of relabel tables (0 is kept as 0).
+    """
+    side = check_box(box) ** 2
+    transpose = rng.integers(0, 2, size=n)
+    rows = random_line_orders(rng, n, box)
+    columns = random_line_orders(rng, n, box)
+    # Cell (r, c) of the result comes from cell (row source, column source) of the transposed grid
+    cells = (rows[:, :, None] * side + columns[:, None, :]).reshape(n, side * side)
+    indices = np.take_along_axis(transpose_index(box)[transpose], cells, axis=1)
+
+    tables = np.zeros((n, side + 1), dtype=np.uint8)
+    tables[:, 1:] = rng.random((n, side)).argsort(axis=1) + 1
+    return indices, tables
+
+
+def apply_transforms(indices: np.ndarray, tables: np.ndarray, grids: np.ndarray) -> np.ndarray:
+    """
+    Apply transformations drawn by random_transforms to flat grids.
+
+    Args:
+    - indices (np.ndarray): The (n, side^2) cell indices.
+    - tables (np.ndarray): The (n, side + 1) relabel tables.
+    - grids (np.ndarray): Either one flat grid (transformed n times) or an (n, side^2) array.
+
+    Returns:
+    - np.ndarray: An (n, side^2) uint8 array of transformed grids.
+    """
+    grids = np.asarray(grids, dtype=np.uint8)
+    # Move the cells with one gather, then relabel them with a second one
+    if grids.ndim == 1:
+        moved = grids[indices]
+    else:
+        moved = np.take_along_axis(grids, indices, axis=1)
+    return np.take_along_axis(tables, moved.astype(np.intp), axis=1)
@@ -0,0 +1,225 @@
+import json
+import numpy as np
+from GridGeometry import INVALID, cell_values
+
+# Byte -> cell value of 9x9 grids: digits are themselves, '.' and '0' are blanks, every other byte is invalid (255)
+CELL_VALUES = cell_values(3)
+
+# Characters dropped from a bracketed list before reading its digits
+LIST_PUNCTUATION = str.maketrans("", "", "[], \t\r\n")
+
+# Brackets and commas turned into spaces, to split a bracketed list of multi-digit values
+LIST_SEPARATORS = str.maketrans("[],", "   ")
+
+# Malformed records listed in an error message
+MAX_REPORTED_ERRORS = 10
+
+
+class GridParseError(ValueError):
+    """
+    Raised for malformed grids; `errors` lists (line number, message) pairs for file input.
+    """
+
+    def __init__(self, message: str, errors: list[tuple[int, str]] | None = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def parse_cells(text: str, box: int = 3) -> np.ndarray:
+    """
+    Parse a single grid into its cells (81 for a 9x9 grid).
+
+    Accepted formats:
+    - one symbol per cell: digits, then letters from A (10) for grids larger than 9x9, with '0' or '.'
+      for blanks (spaces and line breaks are ignored),
+    - a bracketed list, either 2D ([[6, 4, 0, ...], ...]) or flat ([6, 4, 0, ...]).
+
+    Args:
+    - text (str): The grid.
+    - box (int): The box size of the grid (3 for 9x9, 4 for 16x16, 5 for 25x25).
+
+    Returns:
+    - np.ndarray: A (side^2,) uint8 array with 0 for blanks.
+
+    Raises:
+    - GridParseError: If the text is not a grid.
+    """
+    side = box * box
+    text = text.strip()
+    if text.startswith("["):
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError:
+            raise GridParseError("Malformed bracketed list.") from None
+        if isinstance(rows, list) and len(rows) == side and all(isinstance(row, list) and len(row) == side for row in rows):
+            cells = [cell for row in rows for cell in row]
+        elif isinstance(rows, list) and len(rows) == side * side:
+            cells = rows
+        else:
+            raise GridParseError(f"A bracketed grid must be a {side}x{side} or a flat {side * side}-cell list.")
+        if not all(type(cell) is int and 0 <= cell <= side for cell in cells):
+            raise GridParseError(f"Grid cells must be integers from 0 to {side}.")
+        return np.array(cells, dtype=np.uint8)
+
+    compact = "".join(text.split())
+    if len(compact) != side * side:
+        raise GridParseError(f"Expected {side * side} cells, got {len(compact)}.")
+    values = cell_values(box)[np.frombuffer(compact.encode("latin-1", "replace"), dtype=np.uint8)]
+    if (values == INVALID).any():
+        raise GridParseError("Cells must be digits" + (" or letters" if box > 3 else "") + ", with '0' or '.' for blanks.")
+    return values
+
+
+def parse_grid(text: str, box: int = 3) -> list[list[int]]:
+    """
+    Parse a single grid (see parse_cells for the accepted formats) into a 2D list of lists.
+
+    Args:
+    - text (str): The grid.
+    - box (int): The box size of the grid.
+
+    Returns:
+    - list[list[int]]: The grid, row by row, with 0 for blanks.
+
+    Raises:
+    - GridParseError: If the text is not a grid.
+    """
+    return parse_cells(text, box).reshape(box * box, box * box).tolist()
+
+
+def parse_grid_strings(strings, box: int = 3) -> np.ndarray:
+    """
+    Parse many grids stored as bracketed lists (e.g. an Excel column written by str(grid)) at once.
+
+    Args:
+    - strings (iterable of str): The grids.
+    - box (int): The box size of the grids.
+
+    Returns:
+    - np.ndarray: An (N, side^2) uint8 array.
+
+    Raises:
+    - GridParseError: If any string is not a grid; `errors` holds (row, message) pairs, rows counted from 1.
+    """
+    if box != 3:
+        return _parse_value_lists(strings, box)
+    compact = [str(text).translate(LIST_PUNCTUATION) for text in strings]
+    well_sized = np.array([len(text) == 81 for text in compact], dtype=bool)
+    errors = [(int(row) + 1, "Expected 81 single-digit cells.") for row in np.flatnonzero(~well_sized)]
+    # The characters of the well-sized rows are checked too, so one pass reports every bad row
+    sized = "".join(text for text, ok in zip(compact, well_sized) if ok)
+    values = CELL_VALUES[np.frombuffer(sized.encode("latin-1", "replace"), dtype=np.uint8)].reshape(-1, 81)
+    bad_rows = np.flatnonzero(well_sized)[(values == INVALID).any(axis=1)]
+    errors += [(int(row) + 1, "Cells must be digits.") for row in bad_rows]
+    if errors:
+        errors.sort()
+        raise GridParseError(_describe(errors, "row"), errors)
+    return values
+
+
+def _parse_value_lists(strings, box: int) -> np.ndarray:
+    """
+    parse_grid_strings for sizes whose values can take two digits: the lists are split on their
+    separators and all values converted in one step.
+    """
+    cells = box ** 4
+    tokens = [str(text).translate(LIST_SEPARATORS).split() for text in strings]
+    errors = [(row, f"Expected {cells} cells.") for row, values in enumerate(tokens, start=1) if len(values) != cells]
+    rows = [row for row, values in enumerate(tokens, start=1) if len(values) == cells]
+    try:
+        values = np.array([value for row in rows for value in tokens[row - 1]], dtype=np.int64).reshape(-1, cells)
+    except ValueError:
+        # Find the rows holding something other than integers, and leave them out of the range check
+        integer_rows = []
+        for row in rows:
+            if all(value.lstrip("+-").isdigit() for value in tokens[row - 1]):
+                integer_rows.append(row)
+            else:
+                errors.append((row, "Grid cells must be integers."))
+        rows = integer_rows
+        values = np.array([value for row in rows for value in tokens[row - 1]], dtype=np.int64).reshape(-1, cells)
+    bad_rows = np.asarray(rows, dtype=np.int64)[((values < 0) | (values > box * box)).any(axis=1)]
+    errors += [(int(row), f"Cells must be integers from 0 to {box * box}.") for row in bad_rows]
+    if errors:
+        errors.sort()
+        raise GridParseError(_describe(errors, "row"), errors)
+    return values.astype(np.uint8)
+
+
+def parse_lines(lines: list[bytes], first_line: int = 1, strict: bool = True,
+                box: int = 3) -> tuple[np.ndarray, np.ndarray, list[tuple[int, str]]]:
+    """
+    Parse one-puzzle-per-line text (the common community layout, also used by .sdm files).
+
+    Every non-blank line that does not start with '#' holds one puzzle: one symbol per cell (81 digits,
+    '0' or '.' for a 9x9 grid), optionally followed by whitespace and anything else (ratings, comments).
+    All well-formed lines are converted in one vectorized step.
+
+    Args:
+    - lines (list[bytes]): The lines, without line breaks.
+    - first_line (int): The line number of lines[0].
+    - strict (bool): Raise on malformed lines; otherwise skip them and return them in the error list.
+    - box (int): The box size of the grids.
+
+    Returns:
+    - tuple: An (N, side^2) uint8 array of grids, the (N,) line number of every grid,
+      and the (line number, message) pairs of the malformed lines.
+
+    Raises:
+    - GridParseError: In strict mode, if any line is malformed.
+    """
+    cells = box ** 4
+    records, numbers, errors = [], [], []
+    for number, line in enumerate(lines, start=first_line):
+        line = line.strip()
+        if not line or line.startswith(b"#"):
+            continue
+        if len(line) == cells or (len(line) > cells and line[cells:cells + 1].isspace()):
+            records.append(line[:cells])
+            numbers.append(number)
+        else:
+            errors.append((number, f"Expected {cells} cells, got {len(line.split()[0])}."))
+
+    values = cell_values(box)[np.frombuffer(b"".join(records), dtype=np.uint8)].reshape(-1, cells)
+    line_numbers = np.array(numbers, dtype=np.int64)
+
+    # Lines with a character that is not a symbol of the grid size nor '.'
+    bad = (values == INVALID).any(axis=1)
+    if bad.any():
+        message = "Cells must be digits" + (" or letters" if box > 3 else "") + ", with '0' or '.' for blanks."
+        errors.extend((int(number), message) for number in line_numbers[bad])
+        errors.sort()
+        values, line_numbers = values[~bad], line_numbers[~bad]
+
+    if errors and strict:
+        raise GridParseError(_describe(errors, "line"), errors)
+    return values, line_numbers, errors
+
+
+def parse_file(filename: str, strict: bool = True, box: int = 3) -> tuple[np.ndarray, np.ndarray, list[tuple[int, str]]]:
+    """
+    Parse a one-puzzle-per-line file (.txt, .sdm...), see parse_lines.
+
+    Args:
+    - filename (str): The file.
+    - strict (bool): Raise on malformed lines; otherwise skip them.
+    - box (int): The box size of the grids.
+
+    Returns:
+    - tuple: The grids, their line numbers and the malformed lines, as returned by parse_lines.
+    """
+    with open(filename, "rb") as file:
+        lines = file.read().splitlines()
+    try:
+        return parse_lines(lines, strict=strict, box=box)
+    except GridParseError as error:
+        raise GridParseError(f"{filename}: {error}", error.errors) from None
+
+
+def _describe(errors: list[tuple[int, str]], unit: str) -> str:
+    """
+    Summarize malformed records in one message.
+    """
+    shown = "; ".join(f"{unit} {number}: {message}" for number, message in errors[:MAX_REPORTED_ERRORS])
+    more = f" (and {len(errors) - MAX_REPORTED_ERRORS} more)" if len(errors) > MAX_REPORTED_ERRORS else ""
+    return f"{len(errors)} malformed record(s): {shown}{more}"
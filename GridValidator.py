@@ -0,0 +1,163 @@
+import numpy as np
+from GridGeometry import box_for_cells
+
+# Mask of a complete 9x9 unit: bit d set for every digit d (bit 0, an empty cell, is never counted)
+FULL_UNIT = 0b1111111110
+
+
+def full_unit(box: int) -> int:
+    """
+    Mask of a complete unit of a grid with the given box size (FULL_UNIT for 9x9 grids).
+    """
+    return (1 << (box * box + 1)) - 2
+
+
+class GridValidationError(ValueError):
+    """
+    Raised when a batch holds invalid puzzles; `failures` maps the index of every bad puzzle to the reason.
+    """
+
+    def __init__(self, message: str, failures: dict[int, str]):
+        super().__init__(message)
+        self.failures = failures
+
+
+def as_batch(grids, box: int = 3) -> np.ndarray:
+    """
+    View grids (an (N, 81) array, or 9x9 lists as returned by generate_matching_grids) as an (N, side^2) uint8 array.
+    """
+    return np.asarray(grids, dtype=np.uint8).reshape(-1, box ** 4)
+
+
+def _unit_masks(grids: np.ndarray, box: int = 3) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Or and sum of the digit bits of every unit, as two (3 * side, N) arrays.
+
+    The bits are laid out cell-major, (band, row, stack, column, N), so every unit member is a
+    contiguous slab and a unit is combined with side whole-array operations over the batch.
+    """
+    side = box * box
+    # 16 bits hold the sums of 9x9 units; larger values need wider words so a sum never overflows
+    dtype = np.uint16 if side <= 9 else np.uint32
+    # Bit d for digit d; empty cells and out-of-range values (caught separately) get no bit
+    cell_major = np.minimum(np.ascontiguousarray(grids.T), side + 1)
+    cells = (np.left_shift(dtype(1), cell_major, dtype=dtype) & dtype(full_unit(box))).reshape(box, box, box, box, -1)
+    combined = np.zeros((3, side, cells.shape[-1]), dtype=dtype)
+    total = np.zeros_like(combined)
+    for i in range(box):
+        for j in range(box):
+            # Member (i, j) of every row, column and box, each as a (box, box, N) slab
+            members = (cells[:, :, i, j], cells[i, j], cells[:, i, :, j])
+            for kind, member in enumerate(members):
+                combined[kind] |= member.reshape(side, -1)
+                total[kind] += member.reshape(side, -1)
+    return combined.reshape(3 * side, -1), total.reshape(3 * side, -1)
+
+
+def solutions_are_valid(solved, box: int = 3) -> np.ndarray:
+    """
+    Check that complete grids are legal: every cell holds 1-9 and every unit holds all nine digits
+    (1 to side and side values for other sizes).
+
+    Args:
+    - solved: (N, 81) array or list of 9x9 grids.
+    - box (int): The box size of the grids.
+
+    Returns:
+    - np.ndarray: An (N,) boolean array.
+    """
+    solved = as_batch(solved, box)
+    in_range = ((solved >= 1) & (solved <= box * box)).all(axis=1)
+    # Nine cells whose bits cover all nine digits are nine different digits
+    complete = (_unit_masks(solved, box)[0] == full_unit(box)).all(axis=0)
+    return in_range & complete
+
+
+def givens_are_legal(unsolved, box: int = 3) -> np.ndarray:
+    """
+    Check that puzzles do not repeat a digit in any row, column or box.
+
+    Args:
+    - unsolved: (N, 81) array or list of 9x9 grids, 0 for empty cells.
+    - box (int): The box size of the grids.
+
+    Returns:
+    - np.ndarray: An (N,) boolean array.
+    """
+    unsolved = as_batch(unsolved, box)
+    in_range = (unsolved <= box * box).all(axis=1)
+    combined, total = _unit_masks(unsolved, box)
+    # Adding and or-ing the bits only agree when no bit (digit) appears twice
+    distinct = (combined == total).all(axis=0)
+    return in_range & distinct
+
+
+def givens_match_solutions(unsolved, solved, box: int = 3) -> np.ndarray:
+    """
+    Check that every given of a puzzle equals the cell of its solution.
+
+    Args:
+    - unsolved: (N, 81) array or list of 9x9 grids.
+    - solved: (N, 81) array or list of 9x9 grids.
+    - box (int): The box size of the grids.
+
+    Returns:
+    - np.ndarray: An (N,) boolean array.
+    """
+    unsolved, solved = as_batch(unsolved, box), as_batch(solved, box)
+    return ((unsolved == 0) | (unsolved == solved)).all(axis=1)
+
+
+def validate_grids(solved, unsolved, box: int = 3) -> dict[int, str]:
+    """
+    Check a batch of puzzle pairs: legal givens, legal solutions, and givens contained in the solutions.
+    Uniqueness of the solution is not checked here (see SudokuSolver); the symmetry transforms preserve it.
+
+    Args:
+    - solved: (N, 81) array or list of 9x9 solved grids.
+    - unsolved: (N, 81) array or list of 9x9 unsolved grids.
+    - box (int): The box size of the grids.
+
+    Returns:
+    - dict[int, str]: The index and reason of every invalid pair (empty when the batch is valid).
+    """
+    checks = [
+        ("illegal givens", givens_are_legal(unsolved, box)),
+        ("illegal solution", solutions_are_valid(solved, box)),
+        ("givens do not match the solution", givens_match_solutions(unsolved, solved, box)),
+    ]
+    failures = {}
+    for reason, valid in checks:
+        for index in np.flatnonzero(~valid):
+            failures.setdefault(int(index), reason)
+    return failures
+
+
+def validated_batches(batches, on_error: str = "raise"):
+    """
+    Validation stage for a stream of batches, between generation and export.
+
+    Args:
+    - batches (iterable): (solved, unsolved) pairs or (solved, unsolved, difficulty) triples of (k, side^2)
+      arrays; the grid size is read from the width of the arrays.
+    - on_error (str): 'raise' to stop at the first invalid puzzle, 'drop' to leave invalid puzzles out.
+
+    Yields:
+    - tuple: The batches (without the invalid puzzles in 'drop' mode).
+
+    Raises:
+    - GridValidationError: In 'raise' mode, when a batch holds invalid puzzles.
+    """
+    offset = 0
+    for batch in batches:
+        failures = validate_grids(batch[0], batch[1], box_for_cells(np.shape(batch[0])[-1]))
+        if failures and on_error == "raise":
+            index, reason = next(iter(failures.items()))
+            raise GridValidationError(f"{len(failures)} invalid puzzle(s), first at #{offset + index}: {reason}.",
+                                      {offset + i: r for i, r in failures.items()})
+        offset += len(batch[0])
+        if failures:
+            keep = np.ones(len(batch[0]), dtype=bool)
+            keep[list(failures)] = False
+            batch = (batch[0][keep], batch[1][keep], *batch[2:])
+        yield batch
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+from MakeStreamExcel import HEADER_ROW, grid_strings, iter_source_batches
+from DedupIndex import DedupIndex, drop_duplicates
+
+# The manifest records which sources (by content hash) are already in the library and which
+# workbook parts hold each difficulty, so a run only has to write the puzzles it has not seen yet
+MANIFEST_NAME = "excel_manifest.json"
+
+# Fingerprints of every puzzle in the library, so puzzles already ingested from another source are dropped
+DEDUP_INDEX_NAME = "dedup_index.npz"
+
+# Rows per workbook part (Excel sheets stop at 1,048,576 rows)
+PART_ROWS = 1_000_000
+
+
+def file_digest(path: str) -> str:
+    """
+    Compute the SHA-256 of a file, reading it in blocks.
+
+    Args:
+    - path (str): The file to hash.
+
+    Returns:
+    - str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while block := file.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(directory: str = ".") -> dict:
+    """
+    Load the manifest of a library directory.
+
+    Args:
+    - directory (str): The directory holding the workbooks.
+
+    Returns:
+    - dict: The manifest, with 'sources' (digest -> name and counts) and 'parts' (difficulty -> list of parts).
+    """
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"sources": {}, "parts": {}}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_manifest(manifest: dict, directory: str = ".") -> None:
+    """
+    Write the manifest atomically (temporary file + rename), so a crash never leaves it half-written.
+
+    Args:
+    - manifest (dict): The manifest to save.
+    - directory (str): The directory holding the workbooks.
+    """
+    path = os.path.join(directory, MANIFEST_NAME)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+class PartWorkbooks:
+    """
+    Writes new puzzles into new workbook parts (Easy_0001.xlsx, Easy_0002.xlsx...), continuing the
+    numbering of the existing library, and starting a new part whenever one is full.
+    """
+
+    def __init__(self, manifest: dict, directory: str = "."):
+        """
+        Args:
+        - manifest (dict): The current manifest, used for part numbers and titles.
+        - directory (str): Where the parts are written.
+        """
+        self.manifest = manifest
+        self.directory = directory
+        self.open_parts = {}
+        self.new_parts = {}
+        # Last title (puzzle number) used for each difficulty
+        self.titles = {difficulty: sum(part["rows"] for part in parts) for difficulty, parts in manifest["parts"].items()}
+
+    def _start_part(self, difficulty: str) -> None:
+        """
+        Open the next part of a difficulty.
+        """
+        from openpyxl import Workbook  # Loaded on first use, it is slow to import
+        number = len(self.manifest["parts"].get(difficulty, [])) + len(self.new_parts.get(difficulty, [])) + 1
+        book = Workbook(write_only=True)
+        sheet = book.create_sheet("Sheet1")
+        sheet.append(HEADER_ROW)
+        part = {"file": f"{difficulty}_{number:04}.xlsx", "rows": 0}
+        self.new_parts.setdefault(difficulty, []).append(part)
+        self.open_parts[difficulty] = (book, sheet, part)
+
+    def _finish_part(self, difficulty: str) -> None:
+        """
+        Save a part under a temporary name and rename it into place.
+        """
+        book, _, part = self.open_parts.pop(difficulty)
+        path = os.path.join(self.directory, part["file"])
+        temporary = f"{path}.tmp.xlsx"
+        book.save(temporary)
+        os.replace(temporary, path)
+        print(f"Created {path} with {part['rows']} puzzles.")
+
+    def add(self, solved, unsolved, difficulty: str) -> None:
+        """
+        Append a batch of puzzles to the current part of their difficulty.
+        """
+        for unsolved_text, solved_text in zip(grid_strings(unsolved), grid_strings(solved)):
+            if difficulty not in self.open_parts:
+                self._start_part(difficulty)
+            _, sheet, part = self.open_parts[difficulty]
+            self.titles[difficulty] = self.titles.get(difficulty, 0) + 1
+            sheet.append([self.titles[difficulty], unsolved_text, solved_text])
+            part["rows"] += 1
+            if part["rows"] == PART_ROWS:
+                self._finish_part(difficulty)
+
+    def close(self) -> dict[str, list[dict]]:
+        """
+        Save the open parts.
+
+        Returns:
+        - dict[str, list[dict]]: The parts written in this run, per difficulty.
+        """
+        for difficulty in list(self.open_parts):
+            self._finish_part(difficulty)
+        return self.new_parts
+
+
+def export_excel_incremental(sources: list[str], directory: str = ".", dedup: bool = True) -> dict[str, int]:
+    """
+    Add the puzzles of new source files to the workbook library, skipping sources already ingested.
+
+    Only unseen sources are read, and their puzzles go to new workbook parts, so adding 1k puzzles
+    to a large library costs O(1k). Parts are written first and the manifest last: if the run is
+    interrupted, the manifest still describes the previous library, and the next run writes the
+    same parts again.
+
+    Args:
+    - sources (list[str]): Source files (.json, .jsonl or .sudb).
+    - directory (str): The library directory (workbook parts and manifest).
+    - dedup (bool): Drop puzzles already in the library, using a persistent index (DEDUP_INDEX_NAME)
+      saved right after the manifest.
+
+    Returns:
+    - dict[str, int]: The number of new puzzles per difficulty.
+    """
+    manifest = load_manifest(directory)
+    workbooks = PartWorkbooks(manifest, directory)
+    index = DedupIndex(os.path.join(directory, DEDUP_INDEX_NAME)) if dedup else None
+    new_sources = {}
+    added = {}
+
+    for source in sources:
+        digest = file_digest(source)
+        if digest in manifest["sources"] or digest in new_sources:
+            print(f"Skipping {source}: already in the library.")
+            continue
+        counts = {}
+        batches = iter_source_batches(source)
+        if index is not None:
+            batches = drop_duplicates(batches, index)
+        for solved, unsolved, difficulty in batches:
+            workbooks.add(solved, unsolved, difficulty)
+            counts[difficulty] = counts.get(difficulty, 0) + len(solved)
+            added[difficulty] = added.get(difficulty, 0) + len(solved)
+        new_sources[digest] = {"name": os.path.basename(source), "counts": counts}
+
+    # Commit: parts are on disk, now record them together with their sources
+    for difficulty, parts in workbooks.close().items():
+        manifest["parts"].setdefault(difficulty, []).extend(parts)
+    manifest["sources"].update(new_sources)
+    save_manifest(manifest, directory)
+    # The index goes last: an index saved ahead of its manifest would mark the puzzles of unrecorded
+    # sources as seen, and the next run would drop them. A crash here only leaves the index behind
+    # the library, which can let a duplicate through but never loses a puzzle.
+    if index is not None:
+        index.save()
+    return added
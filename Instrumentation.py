@@ -0,0 +1,190 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Seconds between two progress lines
+PROGRESS_INTERVAL = 2.0
+
+# Environment variables turning on the profilers for a whole run (e.g. SUDOKU_PROFILE=1 python Main.py)
+PROFILE_VARIABLE = "SUDOKU_PROFILE"
+TRACEMALLOC_VARIABLE = "SUDOKU_TRACEMALLOC"
+
+# Functions listed in the report when cProfile is on
+PROFILE_TOP = 25
+
+# Directory of the run and benchmark reports, kept out of the working directory where every
+# *.json file is read as a puzzle source (see MakeSingleExcel.MakeExcel)
+REPORT_DIRECTORY = "reports"
+
+
+class Progress:
+    """
+    Progress reporter that prints at most one line every `interval` seconds, however often it is
+    updated, so it can sit in a hot loop.
+    """
+
+    def __init__(self, label: str, total: int | None = None, interval: float = PROGRESS_INTERVAL, stream=None):
+        """
+        Args:
+        - label (str): The text in front of every line.
+        - total (int, optional): The expected number of items, for percentages.
+        - interval (float): Minimum seconds between two lines.
+        - stream (file, optional): Where lines are written (standard output by default).
+        """
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.stream = stream
+        self.done = 0
+        self.started = time.perf_counter()
+        self.next_report = self.started + interval
+
+    def update(self, amount: int = 1) -> None:
+        """
+        Count `amount` more items, printing a line when the interval has elapsed.
+        """
+        self.done += amount
+        if time.perf_counter() >= self.next_report:
+            self._report()
+
+    def _report(self) -> None:
+        now = time.perf_counter()
+        self.next_report = now + self.interval
+        rate = self.done / (now - self.started) if now > self.started else 0
+        share = f" ({self.done / self.total:.0%})" if self.total else ""
+        total = f"/{self.total}" if self.total else ""
+        print(f"{self.label}: {self.done}{total}{share}, {rate:,.0f}/s", file=self.stream or sys.stdout)
+
+    def close(self) -> None:
+        """
+        Print the final line.
+        """
+        self._report()
+
+
+class Instrumentation:
+    """
+    Timers and counters per pipeline stage, with optional cProfile and tracemalloc hooks,
+    summarized in a JSON run report.
+
+    Stages are timed per call (a batch, a file), never per puzzle, so the bookkeeping stays out of the hot path.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.profiler = None
+        self.trace_memory = False
+        if os.environ.get(PROFILE_VARIABLE):
+            self.enable_profiling()
+        if os.environ.get(TRACEMALLOC_VARIABLE):
+            self.enable_memory_tracing()
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        """
+        Time a block of code and add it to a stage.
+
+        Args:
+        - name (str): The stage (e.g. 'parse', 'transform', 'serialize', 'excel_write', 'merge', 'cleanup').
+        - items (int): The number of puzzles handled by the block, for the stage's throughput.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "items": 0})
+            entry["seconds"] += time.perf_counter() - started
+            entry["calls"] += 1
+            entry["items"] += items
+
+    def add_items(self, name: str, items: int) -> None:
+        """
+        Add puzzles to a stage after the fact (when the count is only known once the block has run).
+        """
+        self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "items": 0})["items"] += items
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Increase a counter (files read, files deleted, puzzles skipped...).
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def enable_profiling(self) -> None:
+        """
+        Start cProfile; the slowest functions are listed in the report.
+        """
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def enable_memory_tracing(self) -> None:
+        """
+        Start tracemalloc; the peak traced memory and the top allocation sites are listed in the report.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.trace_memory = True
+
+    def report(self) -> dict:
+        """
+        Summarize the run.
+
+        Returns:
+        - dict: 'started', 'wall_s', 'stages' (seconds, calls, items and items per second),
+          'counters', and 'profile' / 'memory' when those hooks are on.
+        """
+        stages = {}
+        for name, entry in self.stages.items():
+            rate = entry["items"] / entry["seconds"] if entry["items"] and entry["seconds"] else None
+            stages[name] = {**entry, "seconds": round(entry["seconds"], 4), "items_per_s": round(rate, 1) if rate else None}
+        summary = {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "wall_s": round(time.time() - self.started, 3),
+            "stages": stages,
+            "counters": dict(self.counters),
+        }
+        if self.profiler is not None:
+            self.profiler.disable()
+            text = io.StringIO()
+            pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            summary["profile"] = text.getvalue().splitlines()
+            self.profiler.enable()
+        if self.trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            summary["memory"] = {
+                "peak_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 2),
+                "top": [str(stat) for stat in snapshot.statistics("lineno")[:10]],
+            }
+        return summary
+
+    def write_report(self, path: str = os.path.join(REPORT_DIRECTORY, "run_report.json")) -> dict:
+        """
+        Write the run report as JSON and print a one-line summary per stage.
+
+        Args:
+        - path (str): The report file.
+
+        Returns:
+        - dict: The report.
+        """
+        summary = self.report()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=4)
+        for name, entry in summary["stages"].items():
+            rate = f", {entry['items_per_s']:,.0f} puzzles/s" if entry["items_per_s"] else ""
+            print(f"{name}: {entry['seconds']:.2f} s{rate}")
+        print(f"Run report saved to {path}.")
+        return summary
+
+
+# Instrumentation shared by the whole process
+RUN = Instrumentation()
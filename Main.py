@@ -1,7 +1,7 @@
 from MakeJson import MakeJson
-from MakeSingleExcel import MakeExcel
-from NumberToLetter import FromNumberToLetter
-from InputFunctions import get_sudoku_input, get_amount, get_difficulty
+from InputFunctions import get_sudoku_input, get_amount
+from DifficultyGrader import grade_puzzle
+from Instrumentation import RUN
 
 def print_header():
     print("=" * 50)
@@ -19,12 +19,16 @@ def main():
     while True:
         # Get the Sudoku grids
         sudoku_grids = get_sudoku_input()
+
+        # Measure the difficulty of the puzzle from the techniques needed to solve it
+        rating, difficulty = grade_puzzle(sudoku_grids[0])
+        print(f"Measured difficulty: {difficulty} (rating {rating})")
         
         # Unpack the grids into unsolved and solved versions
-        unsolved, solved = FromNumberToLetter(sudoku_grids)
+        unsolved, solved = sudoku_grids
         
         # Generate the JSON for the Sudoku grids
-        MakeJson(solved, unsolved, get_amount(), get_difficulty())
+        MakeJson(solved, unsolved, get_amount(), difficulty)
 
         # Ask the user if they want to generate more puzzles or make the Excel file
         print_menu()
@@ -37,11 +41,14 @@ def main():
         elif user_choice == '2':
             # Generate the Excel file
             print("\nGenerating the Excel file...\n")
+            from MakeSingleExcel import MakeExcel  # The Excel stack is only loaded when it is needed
             MakeExcel()
             print("\nExcel file generated successfully.\n")
+            RUN.write_report()  # Time spent in every stage of the run
             break  # Exit the loop after generating the Excel file
         else:
             print("\nInvalid input. Please enter 1 or 2.\n")
 
 # Run the main program
-main()
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,24 @@
 import os
-import pandas as pd
-import numpy as np
+from AnalysisCache import AnalysisCache
+from Instrumentation import RUN
+from GridParser import parse_grid, parse_grid_strings, GridParseError
+
+def as_grid(value):
+    """
+    Convert a grid stored as text (flat or 9x9 list, or 81 digits) to a 9x9 list, leaving other values unchanged.
+
+    Args:
+    - value: A cell of the workbook.
+
+    Returns:
+    - list[list[int]] or the original value.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return parse_grid(value)
+    except GridParseError:
+        return value
 
 # Function to merge Sudoku files by difficulty level into separate Excel files
 def merge_sudoku_files_by_difficulty(directory:str):
@@ -13,6 +31,8 @@ def merge_sudoku_files_by_difficulty(directory:str):
     Returns:
     - None: Creates output Excel files for each difficulty level and deletes intermediate files.
     """
+    import pandas as pd  # Loaded only when merging, it is slow to import
+
     # Initialize a dictionary to hold lists of DataFrames for each difficulty level
     difficulty_data = {
         "Easy": [],  # Store DataFrames of 'Easy' puzzles
@@ -20,6 +40,9 @@ def merge_sudoku_files_by_difficulty(directory:str):
         "Hard": []  # Store DataFrames of 'Hard' puzzles
     }
 
+    # Grades of unlabeled puzzles, shared across files (variants of one seed are graded once)
+    grades = AnalysisCache()
+
     # Loop through all files in the specified directory
     for filename in os.listdir(directory):
         if filename.endswith(".xlsx"):  # Process only Excel files
@@ -27,14 +50,31 @@ def merge_sudoku_files_by_difficulty(directory:str):
             filepath = os.path.join(directory, filename)
             
             # Read the Excel file into a DataFrame
-            df = pd.read_excel(filepath)
+            with RUN.stage("merge"):
+                df = pd.read_excel(filepath)
+            RUN.add_items("merge", len(df))
+            RUN.count("merge_files_read")
             
-            # Check the filename for difficulty (assuming difficulty is part of the filename)
+            # Route every puzzle by its measured difficulty when the file records it
+            if "Difficulty" in df.columns:
+                for difficulty, group in df.groupby("Difficulty"):
+                    if difficulty in difficulty_data:
+                        difficulty_data[difficulty].append(group.drop(columns="Difficulty"))
+                continue
+
+            # Otherwise check the filename for difficulty (e.g. previously merged Easy/Medium/Hard files)
             for difficulty in difficulty_data:
                 if difficulty in filename:  # If the filename contains a difficulty level
                     # Append the DataFrame to the corresponding difficulty list
                     difficulty_data[difficulty].append(df)
                     break  # Stop checking other difficulties for this file
+            else:
+                # No label at all: grade each unsolved puzzle to find where it belongs
+                if "Unsolved_Puzzle" in df.columns:
+                    grids = parse_grid_strings(df["Unsolved_Puzzle"])
+                    measured = pd.Series([difficulty for _, difficulty in grades.grade_many(grids)], index=df.index)
+                    for difficulty, group in df.groupby(measured):
+                        difficulty_data[difficulty].append(group)
 
     # For each difficulty level, combine the DataFrames and write to a new Excel file
     for difficulty, dfs in difficulty_data.items():
@@ -45,10 +85,7 @@ def merge_sudoku_files_by_difficulty(directory:str):
             # Convert the 'unsolved' and 'solved' columns (lists in string form) to 2D arrays
             for column in ['unsolved', 'solved']:
                 if column in combined_df.columns:  # Ensure the column exists
-                    combined_df[column] = combined_df[column].apply(
-                        lambda x: np.array(eval(x)).reshape(9, 9).tolist() 
-                        if isinstance(x, str) and len(eval(x)) == 81 else x  # Convert only valid 81-character strings
-                    )
+                    combined_df[column] = combined_df[column].apply(as_grid)  # Convert only valid grid strings
 
             # If 'Titolo' column (for puzzle numbering) doesn't exist, create it
             if 'Titolo' not in combined_df.columns:
@@ -56,13 +93,18 @@ def merge_sudoku_files_by_difficulty(directory:str):
 
             # Save the combined DataFrame to a new Excel file for this difficulty level
             output_filename = f"{difficulty}.xlsx"
-            combined_df.to_excel(output_filename, index=False)
+            with RUN.stage("excel_write", len(combined_df)):
+                combined_df.to_excel(output_filename, index=False)
             print(f"Created {output_filename} with {len(combined_df)} puzzles.")
 
     # After processing, delete all .xlsx files containing 'SudokuList' in the filename
     print("Cleaning up: deleting all .xlsx files...")
-    for filename in os.listdir(directory):
-        if filename.endswith(".xlsx") and "SudokuList" in filename:  # Target specific files
-            file_path = os.path.join(directory, filename)
-            os.remove(file_path)  # Delete the file
-            print(f"Deleted {filename}")
+    deleted = 0
+    with RUN.stage("cleanup"):
+        for filename in os.listdir(directory):
+            if filename.endswith(".xlsx") and "SudokuList" in filename:  # Target specific files
+                file_path = os.path.join(directory, filename)
+                os.remove(file_path)  # Delete the file
+                deleted += 1
+    RUN.count("excel_files_deleted", deleted)
+    print(f"Deleted {deleted} intermediate .xlsx files.")
@@ -2,6 +2,13 @@ import random
 import numpy as np
 import json
 import os
+from SymmetryGroup import random_elements, apply_elements
+from GridGeometry import LETTERS, box_for_cells, random_transforms, apply_transforms
+from PuzzleStore import write_store
+from DedupIndex import drop_duplicates
+from Instrumentation import RUN
+from GridValidator import validate_grids, validated_batches, GridValidationError
+from Grid import Grid
 
 def permute_letters(grid:list[list], mapping: dict) -> list[list]:
     """
@@ -145,6 +152,78 @@ def generate_random_grids(solved_grid: list[list], unsolved_grid: list[list]) ->
 
     return solved_grid, unsolved_grid
 
+# Lookup table turning the characters of a letter grid ('A'-'I' and '0', up to 'Y' for 25x25 grids) into small integer codes
+LETTER_CODES = {**{letter: code for code, letter in enumerate(LETTERS, start=1)}, "0": 0, 0: 0}
+
+
+def grid_to_codes(grid: Grid | list[list]) -> np.ndarray:
+    """
+    Convert a grid into a flat array of codes: 81 codes in the range 0-9 for a 9x9 grid
+    (side^2 codes in the range 0-side for the other sizes).
+
+    Args:
+    - grid (Grid, array or list of lists): A Grid (viewed without copying), an array of cells (any shape),
+      a letter grid (as produced by FromNumberToLetter) or a numeric grid.
+
+    Returns:
+    - np.ndarray: A flat uint8 array of length side^2, where 0 marks an empty cell.
+    """
+    if isinstance(grid, Grid):
+        return grid.array
+    if isinstance(grid, np.ndarray):
+        return grid.astype(np.uint8, copy=False).ravel()
+    # Letters A-I become 1-9, numbers are kept as they are
+    return np.array([LETTER_CODES.get(cell, cell) for row in grid for cell in row], dtype=np.uint8)
+
+
+def generate_matching_batch(solved_grid: list[list], unsolved_grid: list[list], n: int,
+                            rng: np.random.Generator | None = None,
+                            elements: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Generate n matching randomized solved and unsolved grids in a single vectorized pass.
+
+    Every puzzle gets a random element of the full Sudoku symmetry group (digit relabeling,
+    transposition, independent row/column orders inside every band and stack, band and stack
+    orders). All n elements are drawn at once and turned into one 81-cell index permutation
+    plus one digit relabel table, which are then applied to both grids with a single gather.
+
+    Grids of other sizes (4x4, 16x16, 25x25, recognized from their number of cells) go through
+    the same two gathers, with transformations drawn by GridGeometry.random_transforms.
+
+    Args:
+    - solved_grid (list of lists): The initial solved grid.
+    - unsolved_grid (list of lists): The initial unsolved grid.
+    - n (int): The number of grid pairs to generate.
+    - rng (np.random.Generator, optional): The random generator to use. By default it is seeded
+      from the random module, so random.seed() keeps results reproducible.
+    - elements (np.ndarray, optional): The (n,) group element codes to apply (see SymmetryGroup)
+      instead of drawing random ones, e.g. to share them with AnalysisCache.analyze_variants.
+      9x9 grids only.
+
+    Returns:
+    - tuple: Two (n, side^2) uint8 arrays containing the solved and unsolved grids, respectively.
+    """
+    solved_codes, unsolved_codes = grid_to_codes(solved_grid), grid_to_codes(unsolved_grid)
+    if elements is None and rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+
+    box = box_for_cells(len(solved_codes))
+    if box != 3:
+        if elements is not None:
+            raise ValueError("Group element codes only describe 9x9 transformations.")
+        indices, tables = random_transforms(rng, n, box)
+        return apply_transforms(indices, tables, solved_codes), apply_transforms(indices, tables, unsolved_codes)
+
+    if elements is None:
+        # Draw every transformation for the whole batch
+        elements = random_elements(rng, n)
+
+    # Apply the transformations to both grids
+    solved = apply_elements(elements, solved_codes)
+    unsolved = apply_elements(elements, unsolved_codes)
+    return solved, unsolved
+
+
 def generate_matching_grids(solved_grid: list[list], unsolved_grid: list[list], n: int) -> tuple[list[list]]:
     """
     Generate n matching randomized solved and unsolved grids.
@@ -157,51 +236,244 @@ def generate_matching_grids(solved_grid: list[list], unsolved_grid: list[list],
     Returns:
     - tuple: Two lists containing the solved and unsolved grids, respectively.
     """
-    solved_grids = []
-    unsolved_grids = []
-    for _ in range(n):
-        solved, unsolved = generate_random_grids(solved_grid, unsolved_grid)
-        solved_grids.append(solved)
-        unsolved_grids.append(unsolved)
-    return solved_grids, unsolved_grids
+    # Generate the whole batch at once and convert it back to 2D lists
+    solved_grids, unsolved_grids = generate_matching_batch(solved_grid, unsolved_grid, n)
+    side = box_for_cells(solved_grids.shape[1]) ** 2
+    return solved_grids.reshape(n, side, side).tolist(), unsolved_grids.reshape(n, side, side).tolist()
 
-def MakeJson(solved_grid: list[list], unsolved_grid: list[list], N: int, difficulty: str) -> None:
+def iter_matching_batches(solved_grid: list[list], unsolved_grid: list[list], n: int, chunk_size: int = 100_000,
+                          rng: np.random.Generator | None = None):
     """
-    Generate a JSON file containing N Sudoku puzzles with solved and unsolved grids.
+    Lazily generate n matching randomized solved and unsolved grids, chunk_size puzzles at a time.
 
     Args:
     - solved_grid (list of lists): The initial solved grid.
     - unsolved_grid (list of lists): The initial unsolved grid.
-    - N (int): The number of puzzles to include.
-    - difficulty (str): The difficulty level of the puzzles.
+    - n (int): The total number of grid pairs to generate.
+    - chunk_size (int): The maximum number of 9x9 grid pairs per chunk; chunks of larger grids hold
+      proportionally fewer pairs, so a chunk always holds about the same number of cells.
+    - rng (np.random.Generator, optional): The random generator to use (see generate_matching_batch).
+
+    Yields:
+    - tuple: Two (k, side^2) uint8 arrays (k <= chunk_size) with the solved and unsolved grids of the chunk.
+    """
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+    cells = len(grid_to_codes(solved_grid))
+    chunk_size = max(1, chunk_size * 81 // cells)
+    for start in range(0, n, chunk_size):
+        yield generate_matching_batch(solved_grid, unsolved_grid, min(chunk_size, n - start), rng)
+
+
+def grid_json_template(box: int = 3) -> tuple[bytes, np.ndarray]:
+    """
+    Build the compact JSON text of a grid with a placeholder in every cell.
+
+    Cells of grids larger than 9x9 are two characters wide: values under 10 are written with a
+    leading space ("[ 7,12,...]"), which is still valid JSON, so every record keeps a fixed width.
+
+    Args:
+    - box (int): The box size of the grid.
 
     Returns:
-    - None: Creates a JSON file with the puzzles.
+    - tuple: The template bytes ("[[0,0,...],...]") and the positions of the cell digits in it,
+      as a (places, side^2) array (one row per decimal place, most significant first).
+    """
+    side = box * box
+    if side <= 9:
+        template = json.dumps([[0] * side] * side, separators=(",", ":")).encode()
+        return template, np.flatnonzero(np.frombuffer(template, dtype=np.uint8) == ord("0"))[None, :]
+    template = json.dumps([[10] * side] * side, separators=(",", ":")).encode()
+    tens = np.flatnonzero(np.frombuffer(template, dtype=np.uint8) == ord("1"))
+    return template, np.stack([tens, tens + 1])
+
+
+def record_template(difficulty: str, output_format: str, box: int = 3) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the fixed-width text of one puzzle record, to be filled with digits by format_records.
+
+    Args:
+    - difficulty (str): The difficulty stamped on every record.
+    - output_format (str): 'jsonl' for one JSON object per line, 'json' for an element of the
+      newboard.grids list (each record then starts with a ',' separator).
+    - box (int): The box size of the grids.
+
+    Returns:
+    - tuple: The record template as a uint8 array and the positions of the unsolved and solved digits.
+    """
+    grid, cells = grid_json_template(box)
+    head = b'{"value":'
+    middle = b',"solution":'
+    tail = b',"difficulty":' + json.dumps(difficulty).encode() + b"}"
+    prefix, suffix = (b"", b"\n") if output_format == "jsonl" else (b",\n", b"")
+    record = prefix + head + grid + middle + grid + tail + suffix
+    value_start = len(prefix) + len(head)
+    solution_start = value_start + len(grid) + len(middle)
+    return np.frombuffer(record, dtype=np.uint8), value_start + cells, solution_start + cells
+
+
+def format_records(template: tuple[np.ndarray, np.ndarray, np.ndarray], solved: np.ndarray, unsolved: np.ndarray) -> bytes:
+    """
+    Serialize a chunk of puzzles by writing their digits into copies of a record template.
+
+    Args:
+    - template (tuple): The result of record_template.
+    - solved (np.ndarray): A (k, side^2) uint8 array of solved grids.
+    - unsolved (np.ndarray): A (k, side^2) uint8 array of unsolved grids.
+
+    Returns:
+    - bytes: The k serialized records, back to back.
+    """
+    record, value_cells, solution_cells = template
+    records = np.tile(record, (len(solved), 1))
+    if len(value_cells) == 1:
+        records[:, value_cells[0]] = unsolved + ord("0")
+        records[:, solution_cells[0]] = solved + ord("0")
+        return records.tobytes()
+    # Two-digit cells: the tens place is a space for values under 10
+    for grids, cells in ((unsolved, value_cells), (solved, solution_cells)):
+        tens, units = np.divmod(grids, 10)
+        records[:, cells[0]] = np.where(tens > 0, tens + ord("0"), ord(" "))
+        records[:, cells[1]] = units + ord("0")
+    return records.tobytes()
+
+
+def write_grids_stream(batches, filename: str, difficulty: str | None, output_format: str = "json") -> int:
+    """
+    Write puzzles to a file chunk by chunk, so memory use does not depend on the number of puzzles.
+
+    Args:
+    - batches (iterable): (solved, unsolved) pairs of (k, side^2) uint8 arrays, e.g. from iter_matching_batches,
+      or (solved, unsolved, difficulty) triples when the difficulty changes from chunk to chunk.
+      The grid size is read from the width of the arrays.
+    - filename (str): The output file.
+    - difficulty (str): The difficulty level of the puzzles, for batches that do not carry one.
+    - output_format (str): 'json' for the newboard.grids schema, 'jsonl' for one compact puzzle per line,
+      'sudb' for a binary puzzle store (see PuzzleStore).
+
+    Returns:
+    - int: The number of puzzles written.
+    """
+    if output_format == "sudb":
+        return write_store(batches, filename, difficulty)
+
+    templates = {}
+    written = 0
+    # Write under a temporary name and rename on success, so an interrupted run never leaves a truncated file
+    temporary = f"{filename}.tmp"
+    try:
+        with open(temporary, "wb") as file:
+            if output_format == "json":
+                file.write(b'{"newboard":{"grids":[\n')
+            batches = iter(batches)
+            while True:
+                # Time the generation of the batch and its serialization separately
+                with RUN.stage("transform"):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                solved, unsolved = batch[0], batch[1]
+                RUN.add_items("transform", len(solved))
+                with RUN.stage("serialize", len(solved)):
+                    label = batch[2] if len(batch) > 2 else difficulty
+                    key = (label, solved.shape[1])
+                    if key not in templates:
+                        templates[key] = record_template(label, output_format, box_for_cells(solved.shape[1]))
+                    chunk = format_records(templates[key], solved, unsolved)
+                    if output_format == "json" and written == 0:
+                        chunk = chunk[2:]  # The first record has no ',' separator before it
+                    file.write(chunk)
+                written += len(solved)
+            if output_format == "json":
+                file.write(b"\n]}}\n")
+    except BaseException:
+        os.remove(temporary)
+        raise
+    os.replace(temporary, filename)
+    return written
+
+
+def reserve_output_name(extension: str, directory: str = "", prefix: str = "SudokuList") -> str:
     """
-    # Generate N matching solved and unsolved grids
-    solved_grids, unsolved_grids = generate_matching_grids(solved_grid, unsolved_grid, N)
+    Atomically reserve the next free numbered output file (e.g. SudokuList004.json).
 
-    # Count the number of existing JSON files in the directory
-    existing_files = [f for f in os.listdir() if f.startswith("SudokuList") and f.endswith(".json")]
+    The file is created with O_EXCL, so two processes running at the same time can never get the same name.
+
+    Args:
+    - extension (str): The file extension, without the dot.
+    - directory (str): The directory of the file (the current directory by default).
+    - prefix (str): The file name prefix.
+
+    Returns:
+    - str: The path of the reserved (empty) file.
+    """
+    # Count the number of existing output files in the directory
+    existing_files = [f for f in os.listdir(directory or ".") if f.startswith(prefix) and f.endswith((".json", ".jsonl", ".sudb"))]
     file_number = len(existing_files) + 1  # Start numbering from 1 if no files exist
 
-    # Prepare the output structure for the JSON file
-    output = {
-        "newboard": {
-            "grids": [
-                {
-                    "value": unsolved_grids[i],
-                    "solution": solved_grids[i],
-                    "difficulty": difficulty
-                }
-                for i in range(N)
-            ]
-        }
-    }
-
-    # Write the output to a JSON file
-    filename = f"SudokuList{file_number:03}.json"
-    with open(filename, "w", encoding="utf-8") as file:
-        json.dump(output, file, indent=4)
+    # Take the first number whose file can be created exclusively
+    while True:
+        path = os.path.join(directory, f"{prefix}{file_number:03}.{extension}")
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return path
+        except FileExistsError:
+            file_number += 1
 
+
+def MakeJson(solved_grid: list[list], unsolved_grid: list[list], N: int, difficulty: str,
+             output_format: str = "json", chunk_size: int = 100_000, dedup_index=None, validate: bool = False) -> None:
+    """
+    Generate a JSON file containing N Sudoku puzzles with solved and unsolved grids.
+    Puzzles are generated and written chunk_size at a time, so memory use stays flat for any N.
+    The seed pair may be 9x9, 4x4, 16x16 or 25x25; the '.sudb' format and the dedup index hold 9x9 grids only.
+
+    Args:
+    - solved_grid (list of lists): The initial solved grid.
+    - unsolved_grid (list of lists): The initial unsolved grid.
+    - N (int): The number of puzzles to include.
+    - difficulty (str): The difficulty level of the puzzles.
+    - output_format (str): 'json' for the newboard.grids schema (SudokuListNNN.json),
+      'jsonl' for one compact puzzle per line (SudokuListNNN.jsonl),
+      'sudb' for a binary puzzle store (SudokuListNNN.sudb).
+    - chunk_size (int): The number of puzzles generated and written at a time.
+    - dedup_index (DedupIndex, optional): Skip the puzzles already seen by this index (see DedupIndex),
+      e.g. to keep a library free of repeats across several runs.
+    - validate (bool): Check every generated puzzle before it is written (see GridValidator).
+      The seed pair itself is always checked.
+
+    Returns:
+    - None: Creates a JSON file with the puzzles.
+
+    Raises:
+    - GridValidationError: If the seed pair is not a legal puzzle and its solution.
+    """
+    # Refuse a seed pair with a typo before anything is written
+    solved_codes, unsolved_codes = grid_to_codes(solved_grid), grid_to_codes(unsolved_grid)
+    box = box_for_cells(len(solved_codes))
+    if box != 3 and (output_format == "sudb" or dedup_index is not None):
+        raise ValueError("The '.sudb' format and the dedup index only hold 9x9 grids.")
+    failures = validate_grids(solved_codes, unsolved_codes, box)
+    if failures:
+        raise GridValidationError(f"Invalid seed pair: {failures[0]}.", failures)
+
+    # Reserve the next numbered file, so concurrent runs never write to the same one
+    filename = reserve_output_name(output_format)
+
+    # Stream the N matching solved and unsolved grids to the file
+    batches = iter_matching_batches(solved_grid, unsolved_grid, N, chunk_size)
+    if validate:
+        batches = validated_batches(batches)
+    if dedup_index is not None:
+        batches = drop_duplicates(batches, dedup_index)
+    try:
+        written = write_grids_stream(batches, filename, difficulty, output_format)
+    except BaseException:
+        # Give back the reserved name, so no empty file is left for MakeExcel to read
+        if os.path.exists(filename) and os.path.getsize(filename) == 0:
+            os.remove(filename)
+        raise
+
+    if written < N:
+        print(f"Dropped {N - written} duplicate puzzles.")
     print(f"File '{filename}' has been created successfully.")
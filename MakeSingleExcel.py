@@ -1,29 +1,59 @@
 import json
 import numpy as np
-import pandas as pd
 import os
 import glob
 from MakeBigExcel import *
+from PuzzleStore import open_store
+from MakeStreamExcel import export_excel_by_difficulty
+from IncrementalExcel import export_excel_incremental, MANIFEST_NAME
+from DedupIndex import DedupIndex
+from Instrumentation import RUN, Progress
+
+def load_sudoku_grids(json_filename: str) -> list[dict]:
+    """
+    Load the puzzles of a file written by MakeJson, in any of its output formats.
+
+    Args:
+    - json_filename (str): A .json file (newboard.grids schema), a .jsonl file (one puzzle per line)
+      or a .sudb binary puzzle store.
+
+    Returns:
+    - list[dict]: The puzzles, each with 'value', 'solution' and 'difficulty' keys.
+    """
+    if json_filename.endswith(".sudb"):
+        return [
+            {"value": unsolved.reshape(9, 9).tolist(), "solution": solved.reshape(9, 9).tolist(), "difficulty": difficulty}
+            for solved_chunk, unsolved_chunk, difficulty in open_store(json_filename).iter_batches()
+            for solved, unsolved in zip(solved_chunk, unsolved_chunk)
+        ]
+    with open(json_filename, "r") as file:
+        if json_filename.endswith(".jsonl"):
+            return [json.loads(line) for line in file if line.strip()]
+        return json.load(file)["newboard"]["grids"]
+
 
 def process_sudoku_puzzles(json_filename: str) -> list[str]:
     """
     Process Sudoku puzzles from a JSON file and generate Excel files categorized by difficulty.
     
     Args:
-    - json_filename (str): The name of the JSON file containing Sudoku data.
+    - json_filename (str): The name of the JSON (or JSON Lines) file containing Sudoku data.
     
     Returns:
     - list[str]: A list of created Excel filenames for each difficulty level.
     """
-    # Load JSON data from the file
-    with open(json_filename, "r") as file:
-        data = json.load(file)
+    import pandas as pd  # Loaded only for this path, it is slow to import
+
+    # Load the puzzles from the file
+    with RUN.stage("parse"):
+        grids = load_sudoku_grids(json_filename)
+    RUN.add_items("parse", len(grids))
     
     # Dictionary to store puzzles categorized by difficulty level
     sudoku_by_difficulty = {}
     
     # Iterate over the grids in the JSON data
-    for grid in data["newboard"]["grids"]:
+    for grid in grids:
         difficulty = grid["difficulty"]
         puzzle_values = grid["value"]
         puzzle_solution = grid["solution"]
@@ -43,60 +73,84 @@ def process_sudoku_puzzles(json_filename: str) -> list[str]:
     for difficulty, puzzles in sudoku_by_difficulty.items():
         # Prepare a list to store data for the current difficulty level
         sudoku_data = []
+        progress = Progress(f"Processing {difficulty}", len(puzzles))
         
         # Iterate over each puzzle in the current difficulty category
-        for counter, puzzle in enumerate(puzzles, start=1):
-            print(f"Processing {difficulty}: {counter}/{len(puzzles)} puzzles")
-            unsolved_grid = np.array(puzzle["unsolved_grid"])  # The unsolved puzzle grid
-            solution_grid = np.array(puzzle["solution_grid"])  # The known solution grid
+        with RUN.stage("serialize", len(puzzles)):
+            for puzzle in puzzles:
+                progress.update()
+                unsolved_grid = np.array(puzzle["unsolved_grid"])  # The unsolved puzzle grid
+                solution_grid = np.array(puzzle["solution_grid"])  # The known solution grid
             
-            # Convert the unsolved grid to a string format (to store as text)
-            unsolved_grid_string = str(unsolved_grid.tolist())
+                # Convert the unsolved grid to a string format (to store as text)
+                unsolved_grid_string = str(unsolved_grid.tolist())
             
-            # Convert the solution grid to a string format (to store as text)
-            solution_grid_string = str(solution_grid.tolist())
+                # Convert the solution grid to a string format (to store as text)
+                solution_grid_string = str(solution_grid.tolist())
             
-            # Append the puzzle data to the list for this difficulty
-            sudoku_data.append({
-                "Unsolved_Puzzle": unsolved_grid_string, 
-                "Solved_Puzzle": solution_grid_string
-            })
-        
+                # Append the puzzle data to the list for this difficulty
+                sudoku_data.append({
+                    "Unsolved_Puzzle": unsolved_grid_string, 
+                    "Solved_Puzzle": solution_grid_string,
+                    "Difficulty": difficulty
+                })
+        progress.close()
+
         # Define the output Excel filename based on the JSON file name and difficulty level
         output_filename = f"{os.path.splitext(os.path.basename(json_filename))[0]}_{difficulty}.xlsx"
         
         # If there is data to write, create a DataFrame and save it as an Excel file
         if sudoku_data:
-            df = pd.DataFrame(sudoku_data)
-            df.to_excel(output_filename, index=False)
+            with RUN.stage("excel_write", len(sudoku_data)):
+                df = pd.DataFrame(sudoku_data)
+                df.to_excel(output_filename, index=False)
             print(f"Excel file saved: {output_filename}")
             created_files.append(output_filename)  # Add to the list of created files
 
     return created_files  # Return the list of created files
 
 
-def MakeExcel() -> None:
+def MakeExcel(streaming: bool = True, incremental: bool = False) -> None:
     """
     Process all Sudoku JSON files in the current directory to create categorized Excel files 
     and merge them by difficulty level.
+
+    Args:
+    - streaming (bool): Write the Easy/Medium/Hard workbooks in a single streaming pass
+      (see MakeStreamExcel). When False, use the older path that writes one workbook per
+      JSON file and then merges them.
+    - incremental (bool): Only add the sources that are not in the library yet, writing them to
+      new workbook parts (Easy_0001.xlsx, ...) tracked by a manifest (see IncrementalExcel).
     """
     # Iterate over all JSON files in the current directory
-    json_files = glob.glob("*.json")
-    all_created_files = []  # List to store all created files
+    json_files = glob.glob("*.json") + glob.glob("*.jsonl") + glob.glob("*.sudb")
+    json_files = [json_file for json_file in json_files if json_file != MANIFEST_NAME]  # Not a puzzle file
+
+    if incremental:
+        # Append only unseen sources; the manifest is committed before any source is deleted
+        export_excel_incremental(json_files, ".")
+    elif streaming:
+        # Stream every puzzle straight into the final workbooks, dropping repeats across the sources
+        # and puzzles already in the existing workbooks
+        export_excel_by_difficulty(json_files, ".", dedup_index=DedupIndex())
+    else:
+        all_created_files = []  # List to store all created files
 
-    # Process each JSON file in the directory
-    for json_file in json_files:
-        print(f"Starting to process {json_file}...")
-        created_files = process_sudoku_puzzles(json_file)  # Get created files for this JSON
-        all_created_files.extend(created_files)  # Add to the list of all created files
-        print(f"{json_file} processed successfully.")
+        # Process each JSON file in the directory
+        for json_file in json_files:
+            print(f"Starting to process {json_file}...")
+            created_files = process_sudoku_puzzles(json_file)  # Get created files for this JSON
+            all_created_files.extend(created_files)  # Add to the list of all created files
+            print(f"{json_file} processed successfully.")
 
-    # Merge all the generated Sudoku files by difficulty
-    merge_sudoku_files_by_difficulty(".")
+        # Merge all the generated Sudoku files by difficulty
+        merge_sudoku_files_by_difficulty(".")
 
-    # After processing, delete only JSON files with 'SudokuList' in the filename
+    # After processing, delete only JSON files with 'SudokuList' in the filename (binary stores are kept)
     print("Cleaning up: deleting all JSON files...")
-    for json_file in json_files:
-        if 'SudokuList' in json_file:
-            os.remove(json_file)
-            print(f"Deleted {json_file}")
+    with RUN.stage("cleanup"):
+        for json_file in json_files:
+            if 'SudokuList' in json_file and not json_file.endswith(".sudb"):
+                os.remove(json_file)
+                RUN.count("source_files_deleted")
+    print(f"Deleted {RUN.counters.get('source_files_deleted', 0)} source files.")
@@ -0,0 +1,272 @@
+import json
+import math
+import os
+import re
+from itertools import islice
+import numpy as np
+from PuzzleStore import open_store, DIFFICULTY_ORDER
+from GridParser import parse_grid_strings, LIST_SEPARATORS
+from GridGeometry import box_for_cells
+from DedupIndex import drop_duplicates
+from Instrumentation import RUN
+
+# Columns of the final Easy/Medium/Hard workbooks (same layout as merge_sudoku_files_by_difficulty)
+HEADER_ROW = ["Titolo", "Unsolved_Puzzle", "Solved_Puzzle"]
+
+# Text of a 9x9 grid as str(list) writes it, with a placeholder digit in every cell
+GRID_TEMPLATE = np.frombuffer(str([[0] * 9] * 9).encode(), dtype=np.uint8)
+GRID_CELLS = np.flatnonzero(GRID_TEMPLATE == ord("0"))
+
+# Opening of the newboard.grids list in a .json source, and the characters allowed between its records
+GRIDS_START = re.compile(r'"grids"\s*:\s*\[')
+RECORD_GAP = re.compile(r"[\s,]*")
+
+# Characters read at a time from a .json source
+READ_BLOCK = 1 << 20
+
+# Rows of an existing workbook added to a dedup index at a time
+INDEX_ROWS = 100_000
+
+
+def grid_strings(grids: np.ndarray) -> list[str]:
+    """
+    Convert a batch of grids to the "[[6, 4, 0, ...], ...]" text stored in the workbooks.
+
+    Args:
+    - grids (np.ndarray): A (k, 81) array of grids with values 0-9 (or a (k, side^2) array of another size).
+
+    Returns:
+    - list[str]: One string per grid, identical to str() of the grid as a 9x9 list.
+    """
+    grids = np.asarray(grids, dtype=np.uint8)
+    if grids.shape[1] != 81:
+        # Two-digit values make the text of larger grids variable-width
+        side = math.isqrt(grids.shape[1])
+        return [str(grid) for grid in grids.reshape(len(grids), side, side).tolist()]
+    # Fill copies of the template with the digits, then cut the buffer into fixed-width strings
+    text = np.tile(GRID_TEMPLATE, (len(grids), 1))
+    text[:, GRID_CELLS] = grids + ord("0")
+    width = len(GRID_TEMPLATE)
+    buffer = text.tobytes().decode("ascii")
+    return [buffer[i:i + width] for i in range(0, len(buffer), width)]
+
+
+def workbook_grids(texts: list[str]) -> np.ndarray:
+    """
+    Parse grids read back from a workbook, taking their size from the first one.
+
+    Args:
+    - texts (list[str]): The grids, as written by grid_strings (all of one size).
+
+    Returns:
+    - np.ndarray: An (n, side^2) uint8 array.
+    """
+    box = box_for_cells(len(str(texts[0]).translate(LIST_SEPARATORS).split()))
+    return parse_grid_strings(texts, box)
+
+
+def iter_json_grids(file, block_size: int = READ_BLOCK):
+    """
+    Read the records of the newboard.grids list of a .json source one by one, a block at a time,
+    so a large file is never loaded whole.
+
+    Args:
+    - file: The open text file.
+    - block_size (int): The characters read at a time.
+
+    Yields:
+    - dict: The puzzle records, in file order.
+
+    Raises:
+    - ValueError: If the file has no newboard.grids list or a record is malformed.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    # Skip to the opening of the list (keeping a tail in case the key straddles two blocks)
+    while (start := GRIDS_START.search(buffer)) is None:
+        block = file.read(block_size)
+        if not block:
+            raise ValueError("The file has no newboard.grids list.")
+        buffer = buffer[-16:] + block
+    position = start.end()
+    while True:
+        position = RECORD_GAP.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            record, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The record runs past the buffer: read on, or fail at the end of the file
+            block = file.read(block_size)
+            if not block:
+                raise
+            buffer = buffer[position:] + block
+            position = 0
+            continue
+        yield record
+        position = end
+
+
+def iter_source_batches(filename: str, chunk_size: int = 100_000):
+    """
+    Read the puzzles of a file written by MakeJson as (solved, unsolved, difficulty) batches.
+
+    Reading and converting a chunk is timed as the 'parse' stage; the work of the consumer between
+    two batches is not.
+
+    Args:
+    - filename (str): A .json, .jsonl or .sudb file.
+    - chunk_size (int): The maximum number of puzzles per batch.
+
+    Yields:
+    - tuple: Two (k, side^2) uint8 arrays (solved and unsolved grids) and the difficulty of the batch.
+    """
+    if filename.endswith(".sudb"):
+        yield from open_store(filename).iter_batches(chunk_size)
+        return
+
+    def convert(puzzles):
+        # One batch per difficulty, in order of appearance
+        pending = {}
+        for puzzle in puzzles:
+            pending.setdefault(puzzle["difficulty"], []).append(puzzle)
+        batches = []
+        for difficulty, group in pending.items():
+            solved = np.array([puzzle["solution"] for puzzle in group], dtype=np.uint8).reshape(len(group), -1)
+            unsolved = np.array([puzzle["value"] for puzzle in group], dtype=np.uint8).reshape(len(group), -1)
+            batches.append((solved, unsolved, difficulty))
+        return batches
+
+    with open(filename, "r") as file:
+        if filename.endswith(".jsonl"):
+            puzzles = (json.loads(line) for line in file if line.strip())
+        else:
+            puzzles = iter_json_grids(file)
+
+        # Decode and convert chunk_size puzzles at a time
+        while True:
+            with RUN.stage("parse"):
+                chunk = list(islice(puzzles, chunk_size))
+                batches = convert(chunk)
+            if not chunk:
+                return
+            RUN.add_items("parse", len(chunk))
+            yield from batches
+
+
+class DifficultyWorkbooks:
+    """
+    One write-only workbook per difficulty, each receiving rows as they arrive.
+
+    openpyxl's write-only mode keeps a constant amount of memory per sheet, and workbooks are written
+    to a temporary name and renamed into place, so an existing Easy/Medium/Hard.xlsx is only replaced
+    once the new one is complete.
+    """
+
+    def __init__(self, directory: str = ".", keep_existing: bool = True, dedup_index=None):
+        """
+        Args:
+        - directory (str): Where the Easy/Medium/Hard.xlsx files are written.
+        - keep_existing (bool): Copy the rows of an already existing workbook before the new ones,
+          so the library keeps growing from run to run.
+        - dedup_index (DedupIndex, optional): With keep_existing, the existing workbooks are copied
+          up front and their puzzles added to this index, so puzzles already in the library are
+          recognized as duplicates.
+        """
+        self.directory = directory
+        self.keep_existing = keep_existing
+        self.books = {}
+        self.counts = {}
+        if keep_existing and dedup_index is not None:
+            for difficulty in DIFFICULTY_ORDER:
+                if os.path.exists(os.path.join(directory, f"{difficulty}.xlsx")):
+                    self._sheet(difficulty, dedup_index)
+
+    def _sheet(self, difficulty: str, dedup_index=None):
+        """
+        Return the sheet of a difficulty, creating its workbook on first use (and adding the
+        puzzles copied from the existing workbook to dedup_index, when given).
+        """
+        if difficulty not in self.books:
+            from openpyxl import Workbook, load_workbook  # Loaded on first use, it is slow to import
+            book = Workbook(write_only=True)
+            sheet = book.create_sheet("Sheet1")
+            sheet.append(HEADER_ROW)
+            self.books[difficulty] = (book, sheet)
+            self.counts[difficulty] = 0
+
+            # Stream the rows of the previous workbook first, renumbering them
+            path = os.path.join(self.directory, f"{difficulty}.xlsx")
+            if self.keep_existing and os.path.exists(path):
+                existing = load_workbook(path, read_only=True)
+                pending = []  # Unsolved grids not added to the index yet
+                for row in existing.active.iter_rows(min_row=2, values_only=True):
+                    self.counts[difficulty] += 1
+                    sheet.append([self.counts[difficulty], *row[1:3]])
+                    if dedup_index is not None:
+                        pending.append(row[1])
+                        if len(pending) == INDEX_ROWS:
+                            dedup_index.check_and_add(workbook_grids(pending))
+                            pending = []
+                if pending:
+                    dedup_index.check_and_add(workbook_grids(pending))
+                existing.close()
+        return self.books[difficulty][1]
+
+    def add(self, solved: np.ndarray, unsolved: np.ndarray, difficulty: str) -> None:
+        """
+        Append a batch of puzzles to the workbook of their difficulty.
+
+        Args:
+        - solved (np.ndarray): A (k, 81) array of solved grids.
+        - unsolved (np.ndarray): A (k, 81) array of unsolved grids.
+        - difficulty (str): The difficulty of every puzzle in the batch.
+        """
+        sheet = self._sheet(difficulty)
+        start = self.counts[difficulty] + 1
+        for title, unsolved_text, solved_text in zip(range(start, start + len(solved)), grid_strings(unsolved), grid_strings(solved)):
+            sheet.append([title, unsolved_text, solved_text])
+        self.counts[difficulty] += len(solved)
+
+    def close(self) -> dict[str, int]:
+        """
+        Save every workbook.
+
+        Returns:
+        - dict[str, int]: The number of puzzles in each saved workbook.
+        """
+        for difficulty, (book, _) in self.books.items():
+            path = os.path.join(self.directory, f"{difficulty}.xlsx")
+            temporary = os.path.join(self.directory, f"{difficulty}.tmp.xlsx")
+            book.save(temporary)
+            os.replace(temporary, path)
+            print(f"Created {path} with {self.counts[difficulty]} puzzles.")
+        self.books = {}
+        return self.counts
+
+
+def export_excel_by_difficulty(sources, directory: str = ".", keep_existing: bool = True, dedup_index=None) -> dict[str, int]:
+    """
+    Stream puzzles straight into the final Easy/Medium/Hard workbooks in a single pass,
+    without per-file workbooks, re-reading, or string/list round-trips.
+
+    Args:
+    - sources (iterable): File names (.json, .jsonl or .sudb), or (solved, unsolved, difficulty) batches.
+    - directory (str): Where the workbooks are written.
+    - keep_existing (bool): Keep the puzzles of existing workbooks (see DifficultyWorkbooks).
+    - dedup_index (DedupIndex, optional): Drop the puzzles already seen by this index; with
+      keep_existing, the puzzles of the existing workbooks are added to it first.
+
+    Returns:
+    - dict[str, int]: The number of puzzles in each workbook.
+    """
+    workbooks = DifficultyWorkbooks(directory, keep_existing, dedup_index)
+    for source in sources:
+        batches = iter_source_batches(source) if isinstance(source, str) else [source]
+        if dedup_index is not None:
+            batches = drop_duplicates(batches, dedup_index)
+        for solved, unsolved, difficulty in batches:
+            with RUN.stage("excel_write", len(solved)):
+                workbooks.add(solved, unsolved, difficulty)
+    with RUN.stage("excel_save"):
+        return workbooks.close()
@@ -1,3 +1,13 @@
+import math
+from GridGeometry import LETTERS, SYMBOLS
+
+# Text symbol -> number (as a string) of the cells of a flattened grid: '7' -> '7', 'A' -> '10' in 16x16 grids
+SYMBOL_NUMBERS = {symbol: str(value) for value, symbol in enumerate(SYMBOLS)}
+
+# Mapping from numbers (1-25) to letters (A-Y)
+DIGIT_TO_LETTER = {str(number): letter for number, letter in enumerate(LETTERS, start=1)}
+
+
 def flatten_sudoku_grid_to_string(sudoku_grid: list[list[int]]) -> str:
     """
     Flattens a 2D Sudoku grid into a single string by concatenating the values row by row.
@@ -15,28 +25,26 @@ def flatten_sudoku_grid_to_string(sudoku_grid: list[list[int]]) -> str:
 def digit_to_sudoku_letter(digit: str) -> str:
     """
     Converts a digit (1-9) to a corresponding letter (A-I) for Sudoku.
+    Larger grids continue the alphabet: 10 is J, 16 is P, 25 is Y.
     
     Args:
-    - digit (str): A string representing a number from 1 to 9.
+    - digit (str): A string representing a number from 1 to 25.
     
     Returns:
-    - str: A letter corresponding to the input digit, or the original input if not in the range 1-9.
+    - str: A letter corresponding to the input digit, or the original input if not in the range 1-25.
     """
-    # Define a mapping from digits (1-9) to letters (A-I)
-    digit_to_letter_map = {
-        "1": "A", "2": "B", "3": "C", "4": "D", "5": "E",
-        "6": "F", "7": "G", "8": "H", "9": "I"
-    }
     # Return the corresponding letter or the digit itself if not mapped
-    return digit_to_letter_map.get(digit, digit)
+    return DIGIT_TO_LETTER.get(digit, digit)
 
 
 def FromNumberToLetter(sudoku_grids: list[list[list[int]] | str]) -> list[list[list[str]]]:
     """
     Converts Sudoku grids (in numeric format) to grids with corresponding letters (A-I).
+    Grids of any size are accepted (4x4, 9x9, 16x16, 25x25); the row length is read from the number of cells.
     
     Args:
-    - sudoku_grids (list[list[list[int]] | str]): A list of Sudoku grids, where each grid can be a 2D list of numbers or a flattened string of numbers.
+    - sudoku_grids (list[list[list[int]] | str]): A list of Sudoku grids, where each grid can be a 2D list of numbers or a flattened string of numbers
+      (one symbol per cell, letters from A for 10 and more in grids larger than 9x9).
     
     Returns:
     - list[list[list[str]]]: A list of converted Sudoku grids where numbers (1-9) are replaced by letters (A-I).
@@ -46,18 +54,15 @@ def FromNumberToLetter(sudoku_grids: list[list[list[int]] | str]) -> list[list[l
 
     # Process each Sudoku grid in the input list
     for grid in sudoku_grids:
-        # Convert 2D grid to a flattened string if the grid is in list format
-        if isinstance(grid, list):
-            flattened_sudoku_string = flatten_sudoku_grid_to_string(grid)
+        # List the cells as number strings, from the 2D grid (values can take two digits) or the flattened string
+        if isinstance(grid, str):
+            cells = [SYMBOL_NUMBERS.get(symbol.upper(), symbol) for symbol in grid]
         else:
-            # Use the string as-is if already flattened
-            flattened_sudoku_string = grid
-
-        # Split the flattened string into rows of 9 characters (Sudoku rows)
-        sudoku_rows = [flattened_sudoku_string[i:i+9] for i in range(0, len(flattened_sudoku_string), 9)]
+            cells = [str(cell) for row in grid for cell in row]
 
-        # Convert each row from a string to a list of characters (representing cells)
-        sudoku_rows_list = [list(row) for row in sudoku_rows]
+        # Split the cells into rows (9 cells for a 9x9 grid)
+        side = math.isqrt(len(cells))
+        sudoku_rows_list = [cells[i:i+side] for i in range(0, len(cells), side)]
 
         # Map each digit in the grid to its corresponding letter (A-I)
         lista = [
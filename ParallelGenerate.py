@@ -0,0 +1,91 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from MakeJson import iter_matching_batches, write_grids_stream, reserve_output_name
+
+
+def plan_shards(N: int, shard_size: int, master_seed: int | None = None) -> tuple[list[int], list[np.random.SeedSequence], int]:
+    """
+    Split N puzzles into fixed-size shards, each with its own random stream.
+
+    The split and the streams only depend on N, shard_size and the master seed (never on the
+    number of workers), so the same master seed always produces the same puzzles.
+
+    Args:
+    - N (int): The total number of puzzles.
+    - shard_size (int): The number of puzzles per shard (the last shard may be smaller).
+    - master_seed (int, optional): The master seed; a fresh one is drawn when omitted.
+
+    Returns:
+    - tuple: The size of every shard, the SeedSequence of every shard, and the master seed used.
+    """
+    root = np.random.SeedSequence(master_seed)
+    sizes = [min(shard_size, N - start) for start in range(0, N, shard_size)]
+    return sizes, root.spawn(len(sizes)), root.entropy
+
+
+def _generate_shard(task: tuple) -> tuple[str, int]:
+    """
+    Worker: generate one shard and write it to its reserved file.
+    """
+    solved_grid, unsolved_grid, count, seed_sequence, difficulty, output_format, filename, chunk_size = task
+    rng = np.random.default_rng(seed_sequence)
+    batches = iter_matching_batches(solved_grid, unsolved_grid, count, chunk_size, rng)
+    return filename, write_grids_stream(batches, filename, difficulty, output_format)
+
+
+def generate_parallel(solved_grid: list[list], unsolved_grid: list[list], N: int, difficulty: str,
+                      workers: int | None = None, master_seed: int | None = None, shard_size: int = 100_000,
+                      output_format: str = "json", directory: str = "", chunk_size: int = 100_000) -> list[str]:
+    """
+    Generate N puzzles on a process pool, one output file per shard.
+
+    Every shard draws from its own random stream derived from the master seed, and every output
+    name is reserved atomically (see MakeJson.reserve_output_name) before the workers start, so
+    concurrent runs never overwrite each other and output is reproducible for any worker count.
+    If a shard fails, the files of the shards not finished are removed before the error is raised.
+
+    Args:
+    - solved_grid (list of lists): The initial solved grid.
+    - unsolved_grid (list of lists): The initial unsolved grid.
+    - N (int): The number of puzzles to generate.
+    - difficulty (str): The difficulty level of the puzzles.
+    - workers (int, optional): The number of worker processes (all cores by default).
+    - master_seed (int, optional): The master seed; printed when drawn at random so the run can be repeated.
+    - shard_size (int): The number of puzzles per shard (and per output file).
+    - output_format (str): 'json', 'jsonl' or 'sudb' (see MakeJson).
+    - directory (str): The output directory (the current directory by default).
+    - chunk_size (int): The number of puzzles generated and written at a time inside a shard.
+
+    Returns:
+    - list[str]: The files written, in shard order.
+    """
+    sizes, seeds, entropy = plan_shards(N, shard_size, master_seed)
+    if master_seed is None:
+        print(f"Master seed: {entropy}")
+
+    # Reserve every output name up front, in shard order
+    filenames = [reserve_output_name(output_format, directory) for _ in sizes]
+    tasks = [
+        (solved_grid, unsolved_grid, size, seed, difficulty, output_format, filename, chunk_size)
+        for size, seed, filename in zip(sizes, seeds, filenames)
+    ]
+
+    finished = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            try:
+                for filename, count in pool.map(_generate_shard, tasks):
+                    finished.add(filename)
+                    print(f"File '{filename}' has been created successfully ({count} puzzles).")
+            except BaseException:
+                pool.shutdown(cancel_futures=True)  # Do not start the shards still waiting
+                raise
+    except BaseException:
+        # Give back the names of the shards not reported finished, so no empty or partial file is
+        # left for MakeExcel to read (the pool has stopped, so no worker still writes to them)
+        for filename in filenames:
+            if filename not in finished and os.path.exists(filename):
+                os.remove(filename)
+        raise
+    return filenames
@@ -0,0 +1,229 @@
+import os
+from functools import lru_cache
+import numpy as np
+from MakeStreamExcel import iter_source_batches
+from DedupIndex import drop_duplicates
+from Instrumentation import RUN
+
+
+@lru_cache(maxsize=None)
+def cell_columns(cells: int = 81) -> tuple[list[str], list[str]]:
+    """
+    Build (once per grid size) the names of the cell columns: given_00 ... given_80, then solution_00
+    ... solution_80 for 9x9 grids (three-digit numbers from 16x16 grids on).
+
+    Returns:
+    - tuple: The given and the solution column names.
+    """
+    width = len(str(cells - 1))
+    return [f"given_{cell:0{width}}" for cell in range(cells)], [f"solution_{cell:0{width}}" for cell in range(cells)]
+
+
+# One uint8 column per cell of a 9x9 grid
+GIVEN_COLUMNS, SOLUTION_COLUMNS = cell_columns(81)
+
+# Rows per Parquet row group (the unit of streaming writes and of filtered reads)
+ROW_GROUP_SIZE = 1_000_000
+
+
+def _pyarrow():
+    """
+    Import pyarrow on first use, so the rest of the pipeline works without it.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("The Parquet exporter needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def puzzle_schema(cells: int = 81):
+    """
+    The Arrow schema of the puzzle files: 81 given and 81 solution uint8 columns (one per cell of
+    the grid size), and a dictionary-encoded difficulty.
+    """
+    pa = _pyarrow()
+    givens, solutions = cell_columns(cells)
+    return pa.schema(
+        [pa.field(name, pa.uint8()) for name in givens + solutions]
+        + [pa.field("difficulty", pa.dictionary(pa.int8(), pa.string()))]
+    )
+
+
+def batch_to_table(solved: np.ndarray, unsolved: np.ndarray, difficulty: str):
+    """
+    Convert a batch of puzzles to an Arrow table (the cell columns are strided views of the batch arrays,
+    copied once into Arrow buffers).
+
+    Args:
+    - solved (np.ndarray): A (k, side^2) uint8 array of solved grids.
+    - unsolved (np.ndarray): A (k, side^2) uint8 array of unsolved grids.
+    - difficulty (str): The difficulty of every puzzle in the batch.
+
+    Returns:
+    - pyarrow.Table: The puzzles.
+    """
+    pa = _pyarrow()
+    cells = solved.shape[1]
+    # Column-major copies, so every column is a contiguous slice
+    givens = np.asfortranarray(unsolved, dtype=np.uint8)
+    solutions = np.asfortranarray(solved, dtype=np.uint8)
+    columns = [pa.array(givens[:, cell]) for cell in range(cells)] + [pa.array(solutions[:, cell]) for cell in range(cells)]
+    labels = pa.DictionaryArray.from_arrays(pa.array(np.zeros(len(solved), dtype=np.int8)), pa.array([difficulty]))
+    return pa.Table.from_arrays(columns + [labels], schema=puzzle_schema(cells))
+
+
+class ParquetPuzzleWriter:
+    """
+    Streams puzzles into Parquet files partitioned by difficulty (directory/difficulty=Easy/part-0000.parquet),
+    buffering each difficulty up to one row group at a time.
+
+    New files never replace existing ones, so a dataset grows by adding parts; every part is written
+    under a temporary name and renamed into place once complete.
+    """
+
+    def __init__(self, directory: str, row_group_size: int = ROW_GROUP_SIZE, compression: str = "zstd"):
+        """
+        Args:
+        - directory (str): The root directory of the dataset.
+        - row_group_size (int): Rows per row group.
+        - compression (str): The Parquet compression codec.
+        """
+        self.directory = directory
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.writers = {}
+        self.pending = {}
+        self.counts = {}
+
+    def _writer(self, difficulty: str, cells: int):
+        """
+        Open the new part of a difficulty on first use (a dataset holds grids of a single size).
+        """
+        if difficulty not in self.writers:
+            pq = _pyarrow().parquet
+            partition = os.path.join(self.directory, f"difficulty={difficulty}")
+            os.makedirs(partition, exist_ok=True)
+            number = len([name for name in os.listdir(partition) if name.endswith(".parquet")])
+            path = os.path.join(partition, f"part-{number:04}.parquet")
+            temporary = f"{path}.tmp"
+            self.writers[difficulty] = (pq.ParquetWriter(temporary, puzzle_schema(cells), compression=self.compression), temporary, path)
+        return self.writers[difficulty][0]
+
+    def _flush(self, difficulty: str) -> None:
+        """
+        Write the buffered puzzles of a difficulty as one row group.
+        """
+        solved, unsolved = zip(*self.pending.pop(difficulty))
+        # Encoding and writing the row group is where the export spends its time
+        with RUN.stage("parquet_write", sum(len(batch) for batch in solved)):
+            table = batch_to_table(np.concatenate(solved), np.concatenate(unsolved), difficulty)
+            self._writer(difficulty, table.num_columns // 2).write_table(table, row_group_size=self.row_group_size)
+
+    def add(self, solved: np.ndarray, unsolved: np.ndarray, difficulty: str) -> None:
+        """
+        Append a batch of puzzles of one difficulty.
+        """
+        pending = self.pending.setdefault(difficulty, [])
+        pending.append((solved, unsolved))
+        self.counts[difficulty] = self.counts.get(difficulty, 0) + len(solved)
+        if sum(len(batch[0]) for batch in pending) >= self.row_group_size:
+            self._flush(difficulty)
+
+    def close(self) -> dict[str, int]:
+        """
+        Write the remaining puzzles and move the parts into place.
+
+        Returns:
+        - dict[str, int]: The number of puzzles written per difficulty.
+        """
+        for difficulty in list(self.pending):
+            self._flush(difficulty)
+        for writer, temporary, path in self.writers.values():
+            # Closing writes the file footer
+            with RUN.stage("parquet_write"):
+                writer.close()
+            os.replace(temporary, path)
+            print(f"Created {path}.")
+        self.writers = {}
+        return self.counts
+
+    def discard(self) -> None:
+        """
+        Drop the buffered puzzles and the unfinished parts, leaving the dataset as it was.
+        """
+        self.pending = {}
+        for writer, temporary, _ in self.writers.values():
+            writer.close()
+            os.remove(temporary)
+        self.writers = {}
+
+    def __enter__(self) -> "ParquetPuzzleWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # A failed export must not add partial parts to the dataset
+        if exc_info[0] is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+def export_parquet(sources, directory: str = "puzzles.parquet", row_group_size: int = ROW_GROUP_SIZE,
+                   dedup_index=None) -> dict[str, int]:
+    """
+    Stream puzzles into a Parquet dataset partitioned by difficulty, as an alternative to the Excel workbooks.
+
+    Args:
+    - sources (iterable): File names (.json, .jsonl or .sudb), or (solved, unsolved, difficulty) batches.
+    - directory (str): The root directory of the dataset.
+    - row_group_size (int): Rows per row group.
+    - dedup_index (DedupIndex, optional): Drop the puzzles already seen by this index.
+
+    Returns:
+    - dict[str, int]: The number of puzzles written per difficulty.
+    """
+    with ParquetPuzzleWriter(directory, row_group_size) as writer:
+        for source in sources:
+            batches = iter_source_batches(source) if isinstance(source, str) else [source]
+            if dedup_index is not None:
+                batches = drop_duplicates(batches, dedup_index)
+            for solved, unsolved, difficulty in batches:
+                writer.add(solved, unsolved, difficulty)
+    return writer.counts
+
+
+def load_parquet(directory: str = "puzzles.parquet", difficulty: str | None = None):
+    """
+    Load a puzzle dataset, or one difficulty of it (only that partition is read).
+
+    Args:
+    - directory (str): The root directory of the dataset.
+    - difficulty (str, optional): The difficulty to load.
+
+    Returns:
+    - pyarrow.Table: The puzzles.
+    """
+    pq = _pyarrow().parquet
+    path = os.path.join(directory, f"difficulty={difficulty}") if difficulty else directory
+    # The difficulty lives in the files, so directory names are not parsed as a partition key
+    return pq.read_table(path, partitioning=None)
+
+
+def table_to_arrays(table) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a puzzle table back to grid arrays.
+
+    Args:
+    - table (pyarrow.Table): Puzzles as written by this module.
+
+    Returns:
+    - tuple: Two (N, side^2) uint8 arrays, the solved and the unsolved grids.
+    """
+    # The grid size follows from the number of cell columns
+    givens, solutions = cell_columns((table.num_columns - 1) // 2)
+
+    def stack(names):
+        return np.column_stack([table.column(name).to_numpy() for name in names]) if table.num_rows else np.empty((0, len(names)), np.uint8)
+    return stack(solutions), stack(givens)
@@ -0,0 +1,269 @@
+import argparse
+import random
+from functools import lru_cache
+import numpy as np
+from SudokuSolver import solve_sudoku, count_solutions
+from SymmetryGroup import random_elements, apply_elements
+from DifficultyGrader import grade_puzzle
+
+# Clue symmetries: each maps a cell (row, column) to the cells that must be removed together with it
+SYMMETRIES = {
+    "none": lambda r, c: [(r, c)],
+    "rotational": lambda r, c: [(r, c), (8 - r, 8 - c)],  # 180-degree rotation
+    "quarter": lambda r, c: [(r, c), (c, 8 - r), (8 - r, 8 - c), (8 - c, r)],  # 90-degree rotations
+    "mirror": lambda r, c: [(r, c), (r, 8 - c)],  # Left-right reflection
+    "diagonal": lambda r, c: [(r, c), (c, r)],  # Reflection on the main diagonal
+}
+
+# Clue target used when a difficulty is asked for without one: minimal puzzles are almost never
+# Easy, while about 38 clues give mostly Easy puzzles and about 30 the most Medium ones
+DEFAULT_CLUES = {"Easy": 38, "Medium": 30, "Hard": 0}
+
+
+def symmetry_orbits(symmetry: str = "none") -> list[list[int]]:
+    """
+    Split the 81 cells into the groups of cells that a clue symmetry removes together.
+
+    Args:
+    - symmetry (str): One of SYMMETRIES.
+
+    Returns:
+    - list[list[int]]: The groups of flat cell indices, each cell appearing in exactly one group.
+    """
+    orbits, seen = [], set()
+    for cell in range(81):
+        if cell in seen:
+            continue
+        orbit = sorted({r * 9 + c for r, c in SYMMETRIES[symmetry](cell // 9, cell % 9)})
+        seen.update(orbit)
+        orbits.append(orbit)
+    return orbits
+
+
+@lru_cache(maxsize=None)
+def reachable_clue_counts(symmetry: str = "none") -> frozenset[int]:
+    """
+    Find (once per symmetry) every number of clues a symmetric puzzle can have: the sums of the
+    sizes of the groups it keeps (with quarter symmetry, only counts of 0 or 1 modulo 4).
+
+    Args:
+    - symmetry (str): One of SYMMETRIES.
+
+    Returns:
+    - frozenset[int]: The reachable clue counts.
+    """
+    counts = {0}
+    for orbit in symmetry_orbits(symmetry):
+        counts |= {count + len(orbit) for count in counts}
+    return frozenset(counts)
+
+
+def clue_target(target_clues: int = 0, symmetry: str = "none", difficulty: str | None = None) -> int:
+    """
+    Check the targets of a generation run and turn them into a clue count that can be hit.
+
+    A target of 0 with a difficulty becomes the default of that difficulty (DEFAULT_CLUES), and a
+    target the symmetry cannot reach is snapped to the nearest reachable count (the larger one on a tie).
+
+    Args:
+    - target_clues (int): The wanted number of clues (0 for as few as possible).
+    - symmetry (str): The clue symmetry (one of SYMMETRIES).
+    - difficulty (str, optional): The wanted difficulty bucket.
+
+    Returns:
+    - int: The clue target to generate with (0 for as few as possible).
+
+    Raises:
+    - ValueError: For an unknown symmetry or difficulty, or a target outside 0-81.
+    """
+    if symmetry not in SYMMETRIES:
+        raise ValueError(f"Unknown symmetry {symmetry!r}, expected one of {', '.join(SYMMETRIES)}.")
+    if difficulty is not None and difficulty not in DEFAULT_CLUES:
+        raise ValueError(f"Unknown difficulty {difficulty!r}, expected one of {', '.join(DEFAULT_CLUES)}.")
+    if not 0 <= target_clues <= 81:
+        raise ValueError(f"The clue target must be between 0 and 81, got {target_clues}.")
+    if target_clues == 0:
+        target_clues = DEFAULT_CLUES.get(difficulty, 0)
+    if target_clues == 0:
+        return 0
+    return min(reachable_clue_counts(symmetry), key=lambda count: (abs(count - target_clues), -count))
+
+
+def random_solved_grid(rng: random.Random) -> list[int]:
+    """
+    Build a random complete grid.
+
+    The three boxes on the main diagonal do not constrain each other, so they are filled with
+    random permutations; the solver completes the grid and a random symmetry of the Sudoku group
+    spreads the result over all grids equivalent to it.
+
+    Args:
+    - rng (random.Random): The random generator.
+
+    Returns:
+    - list[int]: The 81 cells of the grid, row by row.
+    """
+    while True:
+        cells = [0] * 81
+        for box in range(3):
+            digits = rng.sample(range(1, 10), 9)
+            for k, digit in enumerate(digits):
+                cells[(box * 3 + k // 3) * 9 + box * 3 + k % 3] = digit
+        solution, count = solve_sudoku("".join(map(str, cells)), limit=1)
+        if count:
+            break
+
+    # Random relabeling, band/stack/row/column permutation and transposition
+    element = random_elements(np.random.default_rng(rng.getrandbits(64)), 1)
+    grid = np.array(solution, dtype=np.uint8).reshape(1, 81)
+    return apply_elements(element, grid)[0].tolist()
+
+
+def remove_clues(solution: list[int], rng: random.Random, target_clues: int = 0, symmetry: str = "none") -> list[int]:
+    """
+    Remove clues from a complete grid as long as the puzzle keeps a unique solution.
+
+    Cells are tried in random order, a whole symmetry group at a time; a group stays in the grid
+    when removing it would allow a second solution.
+
+    Args:
+    - solution (list[int]): The complete grid (81 cells).
+    - rng (random.Random): The random generator.
+    - target_clues (int): Stop once the puzzle has this many clues or fewer (0 removes as many as possible);
+      with a symmetry, only the counts of clue_target can be hit exactly.
+    - symmetry (str): The clue symmetry (one of SYMMETRIES).
+
+    Returns:
+    - list[int]: The puzzle (81 cells, 0 for empty cells). It can keep more clues than
+      target_clues when no further group can be removed.
+    """
+    puzzle = solution[:]
+    clues = 81
+    orbits = symmetry_orbits(symmetry)
+    rng.shuffle(orbits)
+    for orbit in orbits:
+        if clues <= target_clues:
+            break
+        if clues - len(orbit) < target_clues:
+            continue  # Removing this group would overshoot the target
+        for cell in orbit:
+            puzzle[cell] = 0
+        if count_solutions("".join(map(str, puzzle))) == 1:
+            clues -= len(orbit)
+        else:
+            for cell in orbit:
+                puzzle[cell] = solution[cell]  # Put the group back
+    return puzzle
+
+
+def generate_puzzle(rng: random.Random | None = None, target_clues: int = 0, symmetry: str = "none",
+                    difficulty: str | None = None, max_attempts: int = 100) -> dict | None:
+    """
+    Generate a new puzzle from scratch.
+
+    Args:
+    - rng (random.Random, optional): The random generator (a fresh one by default).
+    - target_clues (int): The wanted number of clues (0 for as few as possible, or the default of
+      the difficulty); adjusted to the symmetry by clue_target.
+    - symmetry (str): The clue symmetry (one of SYMMETRIES).
+    - difficulty (str, optional): The wanted difficulty bucket ('Easy', 'Medium' or 'Hard', see
+      DifficultyGrader); puzzles of other difficulties are discarded.
+    - max_attempts (int): The number of puzzles tried before giving up.
+
+    Returns:
+    - dict | None: 'unsolved' and 'solved' (81-digit strings), 'clues', 'rating' and 'difficulty',
+      or None when no attempt met the targets.
+
+    Raises:
+    - ValueError: For targets that cannot be generated (see clue_target).
+    """
+    rng = rng or random.Random()
+    target_clues = clue_target(target_clues, symmetry, difficulty)
+    for _ in range(max_attempts):
+        solution = random_solved_grid(rng)
+        puzzle = remove_clues(solution, rng, target_clues, symmetry)
+        clues = sum(1 for cell in puzzle if cell)
+        if target_clues and clues > target_clues:
+            continue  # The target was not reachable from this grid
+        rating, bucket = grade_puzzle("".join(map(str, puzzle)))
+        if difficulty and bucket != difficulty:
+            continue
+        return {
+            "unsolved": "".join(map(str, puzzle)),
+            "solved": "".join(map(str, solution)),
+            "clues": clues,
+            "rating": rating,
+            "difficulty": bucket,
+        }
+    return None
+
+
+def generate_seeds(n: int, seed: int | None = None, target_clues: int = 0, symmetry: str = "none",
+                   difficulty: str | None = None) -> list[dict]:
+    """
+    Generate n new seed puzzles, ready for MakeJson or RunBatch.
+
+    Args:
+    - n (int): The number of seeds.
+    - seed (int, optional): The random seed, for reproducible output.
+    - target_clues (int): The wanted number of clues (0 for as few as possible, or the default of the difficulty).
+    - symmetry (str): The clue symmetry (one of SYMMETRIES).
+    - difficulty (str, optional): The wanted difficulty bucket.
+
+    Returns:
+    - list[dict]: The seeds, as returned by generate_puzzle (fewer than n if the targets could not be met).
+
+    Raises:
+    - ValueError: For targets that cannot be generated (see clue_target).
+    """
+    target = clue_target(target_clues, symmetry, difficulty)
+    if target_clues and target != target_clues:
+        print(f"{symmetry.capitalize()} symmetry cannot give {target_clues} clues, using {target}.")
+    target_clues = target
+    rng = random.Random(seed)
+    seeds = []
+    for _ in range(n):
+        puzzle = generate_puzzle(rng, target_clues, symmetry, difficulty)
+        if puzzle is None:
+            print("Could not meet the targets, stopping early.")
+            break
+        seeds.append(puzzle)
+    return seeds
+
+
+def write_seed_library(seeds: list[dict], filename: str) -> None:
+    """
+    Write seeds in the SampleGrids.txt layout (difficulty headers, then unsolved and solved lines),
+    so they can be read back by RunBatch.load_seed_library.
+
+    Args:
+    - seeds (list[dict]): The seeds from generate_seeds.
+    - filename (str): The output file.
+    """
+    with open(filename, "w", encoding="utf-8") as file:
+        for difficulty in ("Easy", "Medium", "Hard"):
+            group = [seed for seed in seeds if seed["difficulty"] == difficulty]
+            if not group:
+                continue
+            file.write(f"{difficulty.upper()}\n")
+            for seed in group:
+                file.write(f"{seed['unsolved']}\n{seed['solved']}\n\n")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate new Sudoku seed puzzles from scratch.")
+    parser.add_argument("-n", "--count", type=int, default=100, help="Number of seeds to generate.")
+    parser.add_argument("-o", "--output", default="GeneratedGrids.txt", help="Seed library file (SampleGrids.txt layout).")
+    parser.add_argument("-c", "--clues", type=int, default=0, help="Target number of clues (0 for as few as possible, or a default per difficulty).")
+    parser.add_argument("--symmetry", default="none", choices=list(SYMMETRIES), help="Clue symmetry.")
+    parser.add_argument("-d", "--difficulty", default=None, choices=["Easy", "Medium", "Hard"], help="Target difficulty.")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Random seed.")
+    args = parser.parse_args(argv)
+
+    seeds = generate_seeds(args.count, args.seed, args.clues, args.symmetry, args.difficulty)
+    write_seed_library(seeds, args.output)
+    print(f"Wrote {len(seeds)} seeds to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
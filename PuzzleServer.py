@@ -0,0 +1,366 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from MakeJson import generate_matching_batch, record_template, format_records
+from RunBatch import load_seed_library, check_seeds, to_grid
+
+# Puzzles kept ready per difficulty, and the level under which a refill starts
+POOL_SIZE = 50_000
+LOW_WATERMARK = 0.5
+
+# Puzzles generated per refill job
+REFILL_BATCH = 10_000
+
+# Seconds a pool waits after a failed refill job before it tries again
+REFILL_RETRY_DELAY = 1.0
+
+# Largest count accepted by /puzzle, and the seconds a request may wait for a refill
+MAX_COUNT = 1_000
+WAIT_TIMEOUT = 5.0
+
+# Request latencies kept for the percentiles of /metrics
+LATENCY_WINDOW = 10_000
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 503: "Service Unavailable"}
+
+
+def generate_records(solved: str, unsolved: str, n: int, difficulty: str, seed: int) -> bytes:
+    """
+    Worker: generate n puzzles from a seed and serialize them, one JSON object per line.
+
+    Args:
+    - solved (str): The solved seed grid (81 digits).
+    - unsolved (str): The unsolved seed grid (81 digits).
+    - n (int): The number of puzzles.
+    - difficulty (str): The difficulty written in every record.
+    - seed (int): The random seed of the batch.
+
+    Returns:
+    - bytes: The records, as written by MakeJson's 'jsonl' format.
+    """
+    rng = np.random.default_rng(seed)
+    solved_batch, unsolved_batch = generate_matching_batch(to_grid(solved), to_grid(unsolved), n, rng)
+    return format_records(record_template(difficulty, "jsonl"), solved_batch, unsolved_batch)
+
+
+class PuzzlePool:
+    """
+    Pre-serialized puzzles of one difficulty, refilled in the background.
+    """
+
+    def __init__(self, difficulty: str, seeds: list[dict], size: int):
+        """
+        Args:
+        - difficulty (str): The difficulty of the pool.
+        - seeds (list[dict]): The seeds of that difficulty (see RunBatch.load_seed_library).
+        - size (int): The number of puzzles the pool is refilled to.
+        """
+        self.difficulty = difficulty
+        self.seeds = seeds
+        self.size = size
+        self.records = deque()
+        self.refilled = asyncio.Event()  # Set after every refill, for requests waiting on an empty pool
+        self.drained = asyncio.Event()  # Set when the pool falls under its low watermark, or cannot serve a request
+        self.pending = 0  # Puzzles of the refill jobs still running
+        self.served = 0
+        self.generated = 0
+        self.refills = 0
+        self.failures = 0
+        self.refill_seconds = 0.0  # Time with at least one refill job running
+
+    def needs_refill(self) -> bool:
+        return len(self.records) < self.size * LOW_WATERMARK
+
+    def take(self, count: int) -> list[bytes]:
+        """
+        Remove up to count puzzles from the pool.
+        """
+        count = min(count, len(self.records))
+        self.served += count
+        taken = [self.records.popleft() for _ in range(count)]
+        if self.needs_refill():
+            self.drained.set()
+        return taken
+
+    def metrics(self) -> dict:
+        return {
+            "depth": len(self.records),
+            "pending": self.pending,
+            "capacity": self.size,
+            "served": self.served,
+            "generated": self.generated,
+            "refills": self.refills,
+            "refill_failures": self.failures,
+            "refill_rate": round(self.generated / self.refill_seconds, 1) if self.refill_seconds else None,
+        }
+
+
+class PuzzleServer:
+    """
+    Local HTTP service answering GET /puzzle?difficulty=Hard&count=k from in-memory pools.
+
+    Puzzles are generated and serialized ahead of time in a process pool, so serving a request is a
+    deque pop and a join. Endpoints:
+    - /puzzle?difficulty=<Easy|Medium|Hard>&count=<k>: {"puzzles": [{"value", "solution", "difficulty"}, ...]}
+    - /metrics: pool depths, served/generated counts, refill rates and request latency percentiles
+    - /health: {"status": "ok"}
+    """
+
+    def __init__(self, seeds: list[dict], pool_size: int = POOL_SIZE, refill_batch: int = REFILL_BATCH,
+                 workers: int | None = None, seed: int | None = None):
+        """
+        Args:
+        - seeds (list[dict]): Valid seeds (see RunBatch.check_seeds), grouped by their difficulty.
+        - pool_size (int): Puzzles kept ready per difficulty.
+        - refill_batch (int): Puzzles generated per refill job.
+        - workers (int, optional): Worker processes (all cores by default).
+        - seed (int, optional): Master random seed of the generated puzzles.
+        """
+        groups = {}
+        for entry in seeds:
+            groups.setdefault(entry["difficulty"], []).append(entry)
+        self.pools = {difficulty: PuzzlePool(difficulty, group, pool_size) for difficulty, group in groups.items()}
+        self.refill_batch = refill_batch
+        self.workers = workers or os.cpu_count()
+        self.rng = random.Random(seed)
+        self.executor = None
+        self.tasks = []
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.started = time.time()
+
+    async def _refill_loop(self, pool: PuzzlePool) -> None:
+        """
+        Fill a pool to capacity, then sleep until it falls under its low watermark or a request
+        cannot be served.
+
+        Refill jobs run concurrently, up to one per worker, until the puzzles ready and on the way
+        reach capacity. A failed job is reported and the pool tries again after REFILL_RETRY_DELAY,
+        so an error never stops the refills for good.
+        """
+        loop = asyncio.get_running_loop()
+        running = {}  # Refill job -> number of puzzles it generates
+        pool.pending = 0
+        try:
+            while True:
+                while len(pool.records) + pool.pending < pool.size and len(running) < self.workers:
+                    entry = self.rng.choice(pool.seeds)
+                    amount = min(self.refill_batch, pool.size - len(pool.records) - pool.pending)
+                    job = loop.run_in_executor(self.executor, generate_records, entry["solved"], entry["unsolved"],
+                                               amount, pool.difficulty, self.rng.getrandbits(64))
+                    running[job] = amount
+                    pool.pending += amount
+                if not running:
+                    pool.drained.clear()
+                    await pool.drained.wait()
+                    continue
+
+                started = time.perf_counter()
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                pool.refill_seconds += time.perf_counter() - started
+                failed = False
+                for job in done:
+                    amount = running.pop(job)
+                    pool.pending -= amount
+                    try:
+                        chunk = job.result()
+                    except Exception as error:
+                        pool.failures += 1
+                        failed = True
+                        print(f"Refill of the {pool.difficulty} pool failed, retrying: {error!r}", file=sys.stderr)
+                        continue
+                    pool.records.extend(chunk.splitlines())
+                    pool.generated += amount
+                    pool.refills += 1
+                    # Wake the requests waiting for puzzles
+                    pool.refilled.set()
+                    pool.refilled = asyncio.Event()
+                if failed:
+                    await asyncio.sleep(REFILL_RETRY_DELAY)
+        finally:
+            # Drop the jobs still running when the pool stops (server shutdown or an error)
+            for job in running:
+                job.cancel()
+
+    def _start_refill(self, pool: PuzzlePool) -> None:
+        """
+        Start the refill task of a pool, restarting it if it ever stops on an error.
+        """
+        task = asyncio.create_task(self._refill_loop(pool))
+        self.tasks.append(task)
+
+        def restart(task: asyncio.Task) -> None:
+            self.tasks.remove(task)
+            if task.cancelled():
+                return
+            print(f"Refill task of the {pool.difficulty} pool stopped, restarting it: {task.exception()!r}", file=sys.stderr)
+            self._start_refill(pool)
+
+        task.add_done_callback(restart)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080, unix_path: str | None = None):
+        """
+        Start the refill tasks and the listening server.
+
+        Args:
+        - host (str): The TCP host.
+        - port (int): The TCP port.
+        - unix_path (str, optional): Listen on this Unix socket instead of TCP.
+
+        Returns:
+        - asyncio.base_events.Server: The running server.
+        """
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        for pool in self.pools.values():
+            self._start_refill(pool)
+        if unix_path:
+            return await asyncio.start_unix_server(self._handle_connection, path=unix_path)
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def stop(self) -> None:
+        """
+        Stop the refill tasks and the worker processes.
+        """
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve the requests of one connection (HTTP/1.1 keep-alive).
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                started = time.perf_counter()
+                parts = request_line.decode("latin-1").split()
+                if len(parts) != 3 or parts[0] != "GET":
+                    status, body = 400, b'{"error":"only GET is supported"}'
+                else:
+                    status, body = await self.route(parts[1])
+                keep_alive = headers.get("connection", "").lower() != "close" and parts[-1:] == ["HTTP/1.1"]
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+                self.latencies.append(time.perf_counter() - started)
+                self.requests += 1
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, target: str) -> tuple[int, bytes]:
+        """
+        Answer one request.
+
+        Args:
+        - target (str): The request target (path and query string).
+
+        Returns:
+        - tuple: The HTTP status and the JSON body.
+        """
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, b'{"status":"ok"}'
+        if url.path == "/metrics":
+            return 200, json.dumps(self.metrics()).encode()
+        if url.path != "/puzzle":
+            return 404, b'{"error":"unknown path"}'
+
+        query = parse_qs(url.query)
+        difficulty = query.get("difficulty", ["Easy"])[0].capitalize()
+        try:
+            count = int(query.get("count", ["1"])[0])
+        except ValueError:
+            count = 0
+        if difficulty not in self.pools:
+            return 404, json.dumps({"error": f"no seeds for difficulty {difficulty!r}"}).encode()
+        if not 1 <= count <= MAX_COUNT:
+            return 400, json.dumps({"error": f"count must be between 1 and {MAX_COUNT}"}).encode()
+
+        pool = self.pools[difficulty]
+        if count > pool.size:
+            return 400, json.dumps({"error": f"count must be at most the pool size, {pool.size}"}).encode()
+        while len(pool.records) < count:
+            # Not enough puzzles (cold start or a burst): start a refill if none is running, and wait for it
+            pool.drained.set()
+            try:
+                await asyncio.wait_for(pool.refilled.wait(), WAIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                return 503, b'{"error":"pool is empty, try again later"}'
+        return 200, b'{"puzzles":[' + b",".join(pool.take(count)) + b"]}"
+
+    def metrics(self) -> dict:
+        """
+        Pool depths, refill rates and request latency percentiles (milliseconds).
+        """
+        latencies = np.array(self.latencies) * 1000
+        percentiles = {f"p{q}": round(float(np.percentile(latencies, q)), 3) for q in (50, 90, 99)} if len(latencies) else {}
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "latency_ms": percentiles,
+            "pools": {difficulty: pool.metrics() for difficulty, pool in self.pools.items()},
+        }
+
+
+async def serve(seed_file: str, host: str, port: int, unix_path: str | None, pool_size: int,
+                refill_batch: int, workers: int | None, seed: int | None) -> None:
+    """
+    Load a seed library and serve puzzles until interrupted.
+    """
+    seeds = check_seeds(load_seed_library(seed_file))
+    server = PuzzleServer(seeds, pool_size, refill_batch, workers, seed)
+    listener = await server.start(host, port, unix_path)
+    print(f"Serving {', '.join(server.pools)} puzzles on {unix_path or f'http://{host}:{port}'}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve Sudoku puzzles from pre-generated in-memory pools.")
+    parser.add_argument("seed_file", help="Seed library in the SampleGrids.txt layout.")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP host.")
+    parser.add_argument("--port", type=int, default=8080, help="TCP port.")
+    parser.add_argument("--unix", default=None, help="Listen on a Unix socket instead of TCP.")
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="Puzzles kept ready per difficulty.")
+    parser.add_argument("--refill-batch", type=int, default=REFILL_BATCH, help="Puzzles generated per refill job.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes.")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Master random seed.")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.seed_file, args.host, args.port, args.unix, args.pool_size,
+                          args.refill_batch, args.workers, args.seed))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import json
+import os
+import struct
+import numpy as np
+
+# Binary puzzle store (.sudb):
+# - a 64-byte header: magic, format version, record size, record count, index length, data offset
+# - a JSON index giving, for every difficulty, its code and the [start, count] range of its records
+# - fixed-width records grouped by difficulty, so "all Hard puzzles" is one contiguous slice
+MAGIC = b"SUDOKUDB"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQIQ")
+HEADER_SIZE = 64
+ALIGNMENT = 64
+
+# One record per puzzle: the 81 givens (0 = empty), the 81 solution cells and a difficulty code
+RECORD_DTYPE = np.dtype([("givens", np.uint8, 81), ("solution", np.uint8, 81), ("difficulty", np.uint8)])
+
+# Order of the difficulty sections in the file; other labels are appended after these
+DIFFICULTY_ORDER = ["Easy", "Medium", "Hard"]
+
+
+class PuzzleStoreWriter:
+    """
+    Writes a binary puzzle store from chunks of puzzles with constant memory.
+
+    Puzzles are spooled to one temporary file per difficulty while they arrive; close() writes the
+    header and index, appends the spools in difficulty order and renames the result into place.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+        - path (str): The store file to create.
+        """
+        self.path = path
+        self.spools = {}
+        self.counts = {}
+        self.codes = {}
+
+    def add(self, solved: np.ndarray, unsolved: np.ndarray, difficulty: str) -> None:
+        """
+        Append a chunk of puzzles.
+
+        Args:
+        - solved (np.ndarray): A (k, 81) array of solved grids.
+        - unsolved (np.ndarray): A (k, 81) array of unsolved grids.
+        - difficulty (str): The difficulty of every puzzle in the chunk.
+        """
+        if np.shape(solved)[-1] != 81:
+            raise ValueError("A puzzle store holds 9x9 grids only.")
+        if difficulty not in self.spools:
+            self.spools[difficulty] = open(f"{self.path}.{difficulty}.tmp", "wb")
+            self.counts[difficulty] = 0
+            # Standard difficulties have fixed codes, other labels are numbered after them as they appear
+            if difficulty in DIFFICULTY_ORDER:
+                self.codes[difficulty] = DIFFICULTY_ORDER.index(difficulty)
+            else:
+                self.codes[difficulty] = len(DIFFICULTY_ORDER) + sum(name not in DIFFICULTY_ORDER for name in self.codes)
+        records = np.empty(len(solved), dtype=RECORD_DTYPE)
+        records["givens"] = unsolved
+        records["solution"] = solved
+        records["difficulty"] = self.codes[difficulty]
+        self.spools[difficulty].write(records.tobytes())
+        self.counts[difficulty] += len(records)
+
+    def _ordered_difficulties(self) -> list[str]:
+        """
+        The difficulties seen so far, in file order.
+        """
+        known = [difficulty for difficulty in DIFFICULTY_ORDER if difficulty in self.spools]
+        return known + [difficulty for difficulty in self.spools if difficulty not in DIFFICULTY_ORDER]
+
+    def close(self) -> None:
+        """
+        Assemble the final store file and remove the temporary spools.
+        """
+        # Build the index: every difficulty section follows the previous one
+        index = {}
+        start = 0
+        for difficulty in self._ordered_difficulties():
+            index[difficulty] = {"code": self.codes[difficulty], "start": start, "count": self.counts[difficulty]}
+            start += self.counts[difficulty]
+        index_bytes = json.dumps(index).encode()
+        data_offset = -(-(HEADER_SIZE + len(index_bytes)) // ALIGNMENT) * ALIGNMENT
+
+        # Write header, index and sections to a temporary file, then move it into place atomically
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, start, len(index_bytes), data_offset).ljust(HEADER_SIZE, b"\0"))
+            file.write(index_bytes.ljust(data_offset - HEADER_SIZE, b"\0"))
+            for difficulty in self._ordered_difficulties():
+                spool = self.spools[difficulty]
+                spool.close()
+                with open(spool.name, "rb") as section:
+                    while block := section.read(1 << 24):
+                        file.write(block)
+                os.remove(spool.name)
+        os.replace(temporary, self.path)
+        self.spools = {}
+
+    def discard(self) -> None:
+        """
+        Drop everything written so far: the spools and the temporary store file are removed,
+        and no store is created.
+        """
+        for spool in self.spools.values():
+            spool.close()
+            if os.path.exists(spool.name):
+                os.remove(spool.name)
+        if os.path.exists(f"{self.path}.tmp"):
+            os.remove(f"{self.path}.tmp")
+        self.spools = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # A write that failed partway must not be committed as a complete store
+        if exc_info[0] is not None:
+            self.discard()
+        else:
+            self.close()
+
+
+class PuzzleStore:
+    """
+    Read-only view of a binary puzzle store through numpy.memmap: nothing is loaded up front,
+    and records, difficulty sections and grid columns are all zero-copy views of the file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+        - path (str): The store file to open.
+        """
+        with open(path, "rb") as file:
+            magic, version, record_size, count, index_length, data_offset = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD_DTYPE.itemsize:
+                raise ValueError(f"{path} is not a version {VERSION} Sudoku store.")
+            file.seek(HEADER_SIZE)
+            self.index = json.loads(file.read(index_length))
+        self.path = path
+        self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=data_offset, shape=(count,)) if count else np.empty(0, dtype=RECORD_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, k):
+        """
+        Random access to puzzle k (or a slice of puzzles) in file order.
+        """
+        return self.records[k]
+
+    @property
+    def difficulties(self) -> list[str]:
+        """
+        The difficulty sections of the store, in file order.
+        """
+        return list(self.index)
+
+    def difficulty(self, name: str) -> np.ndarray:
+        """
+        All the records of one difficulty, as a contiguous slice of the file.
+
+        Args:
+        - name (str): The difficulty, e.g. 'Hard'.
+
+        Returns:
+        - np.ndarray: The records of that difficulty (empty if there are none).
+        """
+        if name not in self.index:
+            return self.records[:0]
+        section = self.index[name]
+        return self.records[section["start"]:section["start"] + section["count"]]
+
+    def iter_batches(self, chunk_size: int = 100_000):
+        """
+        Iterate over the store one chunk at a time, section by section.
+
+        Yields:
+        - tuple: (solved, unsolved, difficulty), with two (k, 81) uint8 views and the difficulty name.
+        """
+        for name in self.index:
+            records = self.difficulty(name)
+            for start in range(0, len(records), chunk_size):
+                chunk = records[start:start + chunk_size]
+                yield chunk["solution"], chunk["givens"], name
+
+
+def open_store(path: str) -> PuzzleStore:
+    """
+    Open a binary puzzle store.
+
+    Args:
+    - path (str): The store file.
+
+    Returns:
+    - PuzzleStore: A read-only, memory-mapped view of the store.
+    """
+    return PuzzleStore(path)
+
+
+def write_store(batches, path: str, difficulty: str | None = None) -> int:
+    """
+    Write puzzles to a binary puzzle store chunk by chunk.
+
+    Args:
+    - batches (iterable): (solved, unsolved) pairs of (k, 81) arrays, or (solved, unsolved, difficulty) triples.
+    - path (str): The store file to create.
+    - difficulty (str, optional): The difficulty of every puzzle, when the batches do not carry one.
+
+    Returns:
+    - int: The number of puzzles written.
+    """
+    written = 0
+    with PuzzleStoreWriter(path) as writer:
+        for batch in batches:
+            solved, unsolved = batch[0], batch[1]
+            writer.add(solved, unsolved, batch[2] if len(batch) > 2 else difficulty)
+            written += len(solved)
+    return written
+
+
+def store_to_json(path: str, filename: str, output_format: str = "json") -> int:
+    """
+    Export a binary puzzle store to a JSON or JSON Lines file, without loading the store in memory.
+
+    Args:
+    - path (str): The store file.
+    - filename (str): The JSON file to create.
+    - output_format (str): 'json' for the newboard.grids schema, 'jsonl' for one puzzle per line.
+
+    Returns:
+    - int: The number of puzzles exported.
+    """
+    from MakeJson import write_grids_stream
+    return write_grids_stream(open_store(path).iter_batches(), filename, None, output_format)
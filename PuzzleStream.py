@@ -0,0 +1,284 @@
+import json
+import queue
+import threading
+import numpy as np
+from MakeJson import generate_matching_batch, grid_to_codes
+from GridParser import parse_cells
+from GridGeometry import box_for_cells
+from GridValidator import validate_grids, GridValidationError
+from RunBatch import load_seed_library, check_seeds
+
+# Puzzles generated at a time; together with the seed it decides the content of the stream
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Seconds between two checks of a stopped consumer, in the prefetch thread
+POLL_INTERVAL = 0.1
+
+
+def seed_cells(grid) -> np.ndarray:
+    """
+    Convert a seed grid to a flat array of cells.
+
+    Args:
+    - grid: A string (one symbol per cell, or a bracketed list), a Grid, an array or a 2D list.
+
+    Returns:
+    - np.ndarray: A flat uint8 array of side^2 cells.
+    """
+    if isinstance(grid, str):
+        text = grid.strip()
+        if text.startswith("["):
+            return np.array(json.loads(text), dtype=np.uint8).ravel()
+        return parse_cells(text, box_for_cells(len("".join(text.split()))))
+    return grid_to_codes(grid)
+
+
+def mixing_weights(seeds: list[dict], weights=None, difficulty_weights: dict[str, float] | None = None) -> np.ndarray:
+    """
+    Compute the probability of drawing each seed.
+
+    Args:
+    - seeds (list[dict]): The seeds; a seed may carry its own 'weight' (1 by default).
+    - weights (sequence of float, optional): One weight per seed, replacing the 'weight' keys.
+    - difficulty_weights (dict[str, float], optional): The share of every difficulty in the stream,
+      split among the seeds of that difficulty in proportion to their weights. Difficulties missing
+      from the dict are never drawn.
+
+    Returns:
+    - np.ndarray: One probability per seed, summing to 1.
+
+    Raises:
+    - ValueError: For a weight count that does not match the seeds, negative weights, or weights that are all zero.
+    """
+    if weights is None:
+        weights = [seed.get("weight", 1.0) for seed in seeds]
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.shape != (len(seeds),):
+        raise ValueError(f"Expected {len(seeds)} seed weights, got {weights.size}.")
+    if difficulty_weights is not None:
+        # Each difficulty gets its share, divided among its seeds by their own weights
+        difficulties = [seed["difficulty"] for seed in seeds]
+        totals = {}
+        for difficulty, weight in zip(difficulties, weights):
+            totals[difficulty] = totals.get(difficulty, 0.0) + weight
+        weights = np.array([difficulty_weights.get(difficulty, 0.0) * weight / totals[difficulty] if totals[difficulty] else 0.0
+                            for difficulty, weight in zip(difficulties, weights)])
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("Weights must be non-negative and not all zero.")
+    return weights / weights.sum()
+
+
+class PuzzleStream:
+    """
+    Lazy, reproducible stream of puzzles drawn from a seed library.
+
+    Every puzzle comes from a seed picked at random with the mixing weights (see mixing_weights),
+    transformed by a random element of the symmetry group. Nothing is generated until it is consumed,
+    one chunk at a time, and nothing is written to disk.
+
+    The stream is a pure function of (seeds, weights, seed, chunk_size): chunk i draws from its
+    own child of the seed sequence, so puzzle #k is the same however the stream is sliced, and a
+    slice starting far ahead does not generate the chunks it skips. Streams are unbounded unless sliced:
+
+        stream = PuzzleStream("SampleGrids.txt", difficulty_weights={"Hard": 3, "Easy": 1}, seed=42)
+        for puzzle in stream[:1000]: ...                      # dicts: value, solution, difficulty
+        write_grids_stream(stream[:10**6].batches(), "out.jsonl", None, "jsonl")
+        export_parquet(stream[:10**7].batches(), "puzzles.parquet")
+    """
+
+    def __init__(self, seeds, weights=None, difficulty_weights: dict[str, float] | None = None, seed: int | None = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, validate: bool = False):
+        """
+        Args:
+        - seeds (str or list[dict]): A seed library file (checked with RunBatch.check_seeds), or seeds
+          with 'solved', 'unsolved' and 'difficulty' entries (strings, Grids, arrays or 2D lists, all of one size).
+        - weights (sequence of float, optional): One weight per seed (see mixing_weights).
+        - difficulty_weights (dict[str, float], optional): The share of every difficulty (see mixing_weights).
+        - seed (int, optional): The random seed; by default fresh entropy is drawn and kept in `entropy`,
+          so the stream can be replayed.
+        - chunk_size (int): Puzzles generated at a time.
+        - validate (bool): Check every chunk before it is handed out (see GridValidator).
+
+        Raises:
+        - ValueError: For seeds of different sizes or without a solution, or invalid weights.
+        """
+        if isinstance(seeds, str):
+            seeds = check_seeds(load_seed_library(seeds))
+        if not seeds:
+            raise ValueError("A puzzle stream needs at least one seed.")
+        if any(entry["solved"] is None for entry in seeds):
+            raise ValueError("Every seed needs its solution (see RunBatch.check_seeds).")
+        self.seeds = seeds
+        self.solved = [seed_cells(entry["solved"]) for entry in seeds]
+        self.unsolved = [seed_cells(entry["unsolved"]) for entry in seeds]
+        self.cells = len(self.solved[0])
+        if any(len(grid) != self.cells for grid in self.solved + self.unsolved):
+            raise ValueError("All the seeds of a stream must have the same size.")
+        self.box = box_for_cells(self.cells)
+        self.difficulties = np.array([entry["difficulty"] for entry in seeds], dtype=object)
+        self.probabilities = mixing_weights(seeds, weights, difficulty_weights)
+        self.entropy = np.random.SeedSequence(seed).entropy
+        self.chunk_size = chunk_size
+        self.validate = validate
+        # The slice of the unbounded stream this object covers
+        self.start, self.stop, self.step = 0, None, 1
+
+    def _copy(self, start: int, stop: int | None, step: int) -> "PuzzleStream":
+        """
+        The same stream restricted to positions range(start, stop, step).
+        """
+        view = object.__new__(PuzzleStream)
+        view.__dict__.update(self.__dict__)
+        view.start, view.stop, view.step = start, stop, step
+        return view
+
+    def __getitem__(self, index):
+        """
+        stream[a:b:c] is a lazy sub-stream (non-negative bounds, as itertools.islice);
+        stream[k] generates the chunk holding puzzle #k and returns that puzzle.
+        """
+        if isinstance(index, slice):
+            start, stop, step = index.start or 0, index.stop, index.step or 1
+            if start < 0 or (stop is not None and stop < 0) or step < 1:
+                raise ValueError("Stream slices take non-negative bounds and a positive step.")
+            if self.stop is not None:
+                stop = len(self) if stop is None else min(stop, len(self))
+            # Compose with the current slice: position p of this stream is start + p * step of the unbounded one
+            return self._copy(self.start + start * self.step,
+                              None if stop is None else self.start + max(stop, start) * self.step, self.step * step)
+        if index < 0:
+            raise IndexError("Streams are indexed from their start only.")
+        if self.stop is not None and index >= len(self):
+            raise IndexError("Stream index out of range.")
+        return next(iter(self[index:index + 1]))
+
+    def __len__(self) -> int:
+        if self.stop is None:
+            raise TypeError("An unbounded stream has no length; slice it first.")
+        return len(range(self.start, self.stop, self.step))
+
+    def take(self, n: int) -> "PuzzleStream":
+        """
+        The first n puzzles of the stream.
+        """
+        return self[:n]
+
+    def _generate_chunk(self, number: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Generate chunk #number of the unbounded stream.
+
+        Returns:
+        - tuple: The (chunk_size, side^2) solved and unsolved grids and the (chunk_size,) difficulties.
+        """
+        rng = np.random.default_rng(np.random.SeedSequence(self.entropy, spawn_key=(number,)))
+        picks = rng.choice(len(self.seeds), size=self.chunk_size, p=self.probabilities)
+        solved = np.empty((self.chunk_size, self.cells), dtype=np.uint8)
+        unsolved = np.empty_like(solved)
+        # One vectorized batch per seed drawn, scattered back to the drawn positions
+        for seed_index in np.flatnonzero(np.bincount(picks, minlength=len(self.seeds))):
+            rows = np.flatnonzero(picks == seed_index)
+            solved[rows], unsolved[rows] = generate_matching_batch(self.solved[seed_index], self.unsolved[seed_index],
+                                                                   len(rows), rng)
+        difficulties = self.difficulties[picks]
+        if self.validate:
+            failures = validate_grids(solved, unsolved, self.box)
+            if failures:
+                index, reason = next(iter(failures.items()))
+                raise GridValidationError(f"{len(failures)} invalid puzzle(s) in chunk {number}, first at #{index}: {reason}.",
+                                          {number * self.chunk_size + i: r for i, r in failures.items()})
+        return solved, unsolved, difficulties
+
+    def _iter_chunks(self):
+        """
+        Generate the chunks overlapping the slice, keeping only the positions of the slice.
+        """
+        size = self.chunk_size
+        position = self.start  # Next position of the slice
+        while self.stop is None or position < self.stop:
+            number = position // size
+            chunk_end = (number + 1) * size
+            end = chunk_end if self.stop is None else min(chunk_end, self.stop)
+            solved, unsolved, difficulties = self._generate_chunk(number)
+            rows = np.arange(position, end, self.step) - number * size
+            if len(rows) == size:
+                yield solved, unsolved, difficulties
+            else:
+                yield solved[rows], unsolved[rows], difficulties[rows]
+            # First position of the slice after this chunk (chunks holding none of them are never generated)
+            position += len(rows) * self.step
+
+    def chunks(self, prefetch: int = 0):
+        """
+        Iterate over the stream chunk by chunk.
+
+        Without prefetching a chunk is generated when it is asked for, so a slow consumer never
+        piles up puzzles. With prefetch=k a background thread keeps up to k chunks ready, and waits
+        whenever the consumer falls k chunks behind.
+
+        Args:
+        - prefetch (int): The number of chunks generated ahead of the consumer.
+
+        Yields:
+        - tuple: The (k, side^2) uint8 solved and unsolved grids and the (k,) difficulties of each chunk.
+        """
+        if prefetch <= 0:
+            yield from self._iter_chunks()
+            return
+
+        ready = queue.Queue(maxsize=prefetch)
+        stopped = threading.Event()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self._iter_chunks():
+                    # A full queue blocks the producer until the consumer catches up, or leaves
+                    while not stopped.is_set():
+                        try:
+                            ready.put(chunk, timeout=POLL_INTERVAL)
+                            break
+                        except queue.Full:
+                            continue
+                    if stopped.is_set():
+                        return
+                ready.put(done)
+            except BaseException as error:
+                ready.put(error)
+
+        worker = threading.Thread(target=produce, name="PuzzleStream-prefetch", daemon=True)
+        worker.start()
+        try:
+            while (item := ready.get()) is not done:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+
+    def batches(self, prefetch: int = 0):
+        """
+        Iterate over the stream as (solved, unsolved, difficulty) batches of a single difficulty, the
+        input of MakeJson.write_grids_stream, PuzzleStore.write_store, ParquetExport.export_parquet
+        and MakeStreamExcel.export_excel_by_difficulty.
+
+        Args:
+        - prefetch (int): The number of chunks generated ahead of the consumer (see chunks).
+
+        Yields:
+        - tuple: The (k, side^2) uint8 solved and unsolved grids and their difficulty.
+        """
+        for solved, unsolved, difficulties in self.chunks(prefetch):
+            labels, first = np.unique(difficulties, return_index=True)
+            # Difficulties in order of first appearance in the chunk
+            for label in labels[np.argsort(first)]:
+                rows = difficulties == label
+                yield solved[rows], unsolved[rows], label
+
+    def __iter__(self):
+        """
+        Iterate over the puzzles one by one, as {"value", "solution", "difficulty"} dicts whose grids
+        are flat uint8 views into the chunk.
+        """
+        for solved, unsolved, difficulties in self.chunks():
+            for value, solution, difficulty in zip(unsolved, solved, difficulties):
+                yield {"value": value, "solution": solution, "difficulty": difficulty}
@@ -0,0 +1,259 @@
+import argparse
+import os
+import time
+import numpy as np
+from MakeJson import iter_matching_batches, write_grids_stream
+from PuzzleStore import write_store, open_store
+from SudokuSolver import solve_sudoku, flatten_grid
+from DifficultyGrader import grade_puzzle
+from DedupIndex import DedupIndex, drop_duplicates
+from Instrumentation import RUN
+from GridParser import parse_cells, GridParseError
+from GridValidator import validated_batches
+from Grid import Grid
+
+
+def load_seed_library(filename: str) -> list[dict]:
+    """
+    Read a seed library in the SampleGrids.txt layout: a difficulty header (EASY, MEDIUM, HARD)
+    followed by seeds, each an unsolved grid on one line (81 digits with '0' or '.' blanks, or a
+    bracketed list) optionally followed by its solved grid.
+
+    Args:
+    - filename (str): The seed library file.
+
+    Returns:
+    - list[dict]: One entry per seed with 'difficulty', 'unsolved', 'solved' (81-digit strings,
+      'solved' is None when the file does not give it) and 'line' (line number of the unsolved grid).
+    """
+    seeds = []
+    difficulty = None
+    with open(filename, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.isalpha():
+                difficulty = line.capitalize()  # New difficulty section
+            else:
+                try:
+                    cells = parse_cells(line)
+                except GridParseError as error:
+                    print(f"{filename}:{line_number}: ignoring unrecognized line ({error})")
+                    continue
+                digits = (cells + ord("0")).tobytes().decode("ascii")
+                # A complete grid right after an unsolved one is its solution
+                if "0" not in digits and seeds and seeds[-1]["solved"] is None:
+                    seeds[-1]["solved"] = digits
+                else:
+                    seeds.append({"difficulty": difficulty, "unsolved": digits, "solved": None, "line": line_number})
+    return seeds
+
+
+def check_seeds(seeds: list[dict], measure_difficulty: bool = False) -> list[dict]:
+    """
+    Solve every seed, fill in missing solutions and drop the seeds that are not valid puzzles.
+
+    Args:
+    - seeds (list[dict]): Seeds from load_seed_library.
+    - measure_difficulty (bool): Replace the difficulty from the file with the measured one.
+
+    Returns:
+    - list[dict]: The valid seeds.
+    """
+    valid = []
+    for seed in seeds:
+        solution, count = solve_sudoku(seed["unsolved"])
+        if count != 1:
+            print(f"Skipping seed on line {seed['line']}: it has {'no' if count == 0 else 'more than one'} solution.")
+            continue
+        if seed["solved"] is not None and flatten_grid(seed["solved"]) != flatten_grid(solution):
+            print(f"Skipping seed on line {seed['line']}: the given solution does not match the puzzle.")
+            continue
+        seed["solved"] = "".join(str(cell) for row in solution for cell in row)
+        if measure_difficulty or seed["difficulty"] is None:
+            seed["difficulty"] = grade_puzzle(seed["unsolved"])[1]
+        valid.append(seed)
+    return valid
+
+
+def drop_duplicate_seeds(seeds: list[dict]) -> list[dict]:
+    """
+    Drop the seeds that are symmetric copies of an earlier seed (same canonical form),
+    since they would only produce the same family of puzzles again.
+
+    Args:
+    - seeds (list[dict]): The valid seeds.
+
+    Returns:
+    - list[dict]: The seeds without the repeated ones.
+    """
+    index = DedupIndex(mode="canonical")
+    fresh = index.check_and_add(np.array([to_grid(seed["unsolved"]).array for seed in seeds], dtype=np.uint8).reshape(-1, 81))
+    for seed, keep in zip(seeds, fresh):
+        if not keep:
+            print(f"Skipping seed on line {seed['line']}: it is a symmetric copy of an earlier seed.")
+    return [seed for seed, keep in zip(seeds, fresh) if keep]
+
+
+def plan_counts(seeds: list[dict], per_seed: int, per_difficulty: dict[str, int]) -> list[int]:
+    """
+    Decide how many puzzles to generate from each seed.
+
+    Args:
+    - seeds (list[dict]): The valid seeds.
+    - per_seed (int): Puzzles per seed, for difficulties not listed in per_difficulty.
+    - per_difficulty (dict[str, int]): Total puzzles per difficulty, spread evenly over its seeds.
+
+    Returns:
+    - list[int]: The number of puzzles for each seed.
+    """
+    group_sizes = {}
+    for seed in seeds:
+        group_sizes[seed["difficulty"]] = group_sizes.get(seed["difficulty"], 0) + 1
+
+    counts = []
+    positions = {}
+    for seed in seeds:
+        difficulty = seed["difficulty"]
+        if difficulty not in per_difficulty:
+            counts.append(per_seed)
+            continue
+        # Even split, the first seeds of the difficulty taking the remainder
+        position = positions.get(difficulty, 0)
+        positions[difficulty] = position + 1
+        share, remainder = divmod(per_difficulty[difficulty], group_sizes[difficulty])
+        counts.append(share + (1 if position < remainder else 0))
+    return counts
+
+
+def to_grid(digits: str) -> Grid:
+    """
+    Convert an 81-digit string to a Grid.
+    """
+    return Grid.from_string(digits)
+
+
+def iter_seed_batches(seeds: list[dict], counts: list[int], rng: np.random.Generator, chunk_size: int):
+    """
+    Generate the puzzles of every seed as (solved, unsolved, difficulty) batches.
+    """
+    for seed, count in zip(seeds, counts):
+        for solved, unsolved in iter_matching_batches(to_grid(seed["solved"]), to_grid(seed["unsolved"]), count, chunk_size, rng):
+            yield solved, unsolved, seed["difficulty"]
+
+
+def run_batch(seed_file: str, output_dir: str, output_format: str = "jsonl", per_seed: int = 100,
+              per_difficulty: dict[str, int] | None = None, seed: int | None = None,
+              chunk_size: int = 100_000, measure_difficulty: bool = False, dedup: bool = False,
+              validate: bool = False) -> dict[str, int]:
+    """
+    Run the whole generate -> export pipeline for a seed library, without any prompt.
+
+    Args:
+    - seed_file (str): The seed library (SampleGrids.txt layout).
+    - output_dir (str): The directory receiving the output files.
+    - output_format (str): 'json' or 'jsonl' (one file per difficulty), 'sudb' (one binary store),
+      'excel' (Easy/Medium/Hard.xlsx) or 'parquet' (a dataset partitioned by difficulty, needs pyarrow).
+    - per_seed (int): Puzzles generated from each seed.
+    - per_difficulty (dict[str, int], optional): Total puzzles for some difficulties, overriding per_seed.
+    - seed (int, optional): Master random seed, for reproducible output.
+    - chunk_size (int): Puzzles generated and written at a time.
+    - measure_difficulty (bool): Use the measured difficulty instead of the file's section headers.
+    - dedup (bool): Drop seeds that are symmetric copies of each other, and puzzles generated twice.
+    - validate (bool): Check every generated puzzle before it is written (see GridValidator).
+
+    Returns:
+    - dict[str, int]: The number of puzzles written per difficulty.
+    """
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    # Load and check the seeds, then decide how many puzzles each one produces
+    library = load_seed_library(seed_file)
+    seeds = check_seeds(library, measure_difficulty)
+    if dedup:
+        seeds = drop_duplicate_seeds(seeds)
+    counts = plan_counts(seeds, per_seed, per_difficulty or {})
+    index = DedupIndex() if dedup else None
+
+    def generate(group_seeds, group_counts):
+        # Puzzle batches of some seeds, through the dedup index when enabled
+        batches = iter_seed_batches(group_seeds, group_counts, rng, chunk_size)
+        if validate:
+            batches = validated_batches(batches)
+        return batches if index is None else drop_duplicates(batches, index)
+
+    planned = {}
+    for seed_entry, count in zip(seeds, counts):
+        planned[seed_entry["difficulty"]] = planned.get(seed_entry["difficulty"], 0) + count
+
+    # Generate and export, keeping the counts the writers report (dedup can drop planned puzzles)
+    if output_format == "sudb":
+        path = os.path.join(output_dir, "SudokuLibrary.sudb")
+        write_store(generate(seeds, counts), path)
+        store = open_store(path)
+        written = {difficulty: len(store.difficulty(difficulty)) for difficulty in store.difficulties}
+    elif output_format == "excel":
+        from MakeStreamExcel import export_excel_by_difficulty
+        written = export_excel_by_difficulty(generate(seeds, counts), output_dir, keep_existing=False)
+    elif output_format == "parquet":
+        from ParquetExport import export_parquet
+        written = export_parquet(generate(seeds, counts), os.path.join(output_dir, "puzzles.parquet"))
+    else:
+        written = {}
+        for difficulty in planned:
+            group = [(s, c) for s, c in zip(seeds, counts) if s["difficulty"] == difficulty]
+            batches = generate([s for s, _ in group], [c for _, c in group])
+            written[difficulty] = write_grids_stream(batches, os.path.join(output_dir, f"{difficulty}.{output_format}"),
+                                                     difficulty, output_format)
+
+    # Throughput summary
+    elapsed = time.perf_counter() - started
+    total = sum(written.values())
+    print("=" * 50)
+    print(f"Seeds: {len(seeds)} used, {len(library) - len(seeds)} skipped")
+    for difficulty, amount in written.items():
+        dropped = planned.get(difficulty, 0) - amount
+        print(f"{difficulty}: {amount} puzzles" + (f" ({dropped} duplicates dropped)" if dropped > 0 else ""))
+    print(f"Total: {total} puzzles in {elapsed:.2f} s ({total / elapsed if elapsed else 0:,.0f} puzzles/s)")
+    print("=" * 50)
+    return written
+
+
+def parse_per_difficulty(text: str) -> dict[str, int]:
+    """
+    Parse a "Easy=1000,Hard=500" option into a dictionary.
+    """
+    counts = {}
+    for item in text.split(","):
+        name, _, amount = item.partition("=")
+        counts[name.strip().capitalize()] = int(amount)
+    return counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate Sudoku puzzles from a seed library without any prompt.")
+    parser.add_argument("seed_file", help="Seed library in the SampleGrids.txt layout.")
+    parser.add_argument("-o", "--output-dir", default=".", help="Directory receiving the output files.")
+    parser.add_argument("-f", "--format", default="jsonl", choices=["json", "jsonl", "sudb", "excel", "parquet"], help="Output format.")
+    parser.add_argument("-n", "--per-seed", type=int, default=100, help="Puzzles generated from each seed.")
+    parser.add_argument("-d", "--per-difficulty", type=parse_per_difficulty, default=None,
+                        help='Total puzzles per difficulty, e.g. "Easy=1000,Hard=500" (overrides --per-seed).')
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Master random seed.")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Puzzles generated and written at a time.")
+    parser.add_argument("--measure-difficulty", action="store_true", help="Grade the seeds instead of trusting the file headers.")
+    parser.add_argument("--dedup", action="store_true", help="Drop symmetric copies among the seeds and repeated puzzles.")
+    parser.add_argument("--validate", action="store_true", help="Check every generated puzzle before it is written.")
+    parser.add_argument("--report", default=None, help="Write a JSON run report (time per stage) to this file.")
+    args = parser.parse_args(argv)
+
+    run_batch(args.seed_file, args.output_dir, args.format, args.per_seed, args.per_difficulty,
+              args.seed, args.chunk_size, args.measure_difficulty, args.dedup, args.validate)
+    if args.report:
+        RUN.write_report(args.report)
+
+
+if __name__ == "__main__":
+    main()
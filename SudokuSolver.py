@@ -0,0 +1,196 @@
+from Grid import Grid
+
+# Bitmask Sudoku solver: every row, column and box keeps a 9-bit mask of the digits it already
+# contains (bit d set for digit d), so the candidates of a cell are a couple of bitwise operations.
+ALL_DIGITS = 0b1111111110  # bits 1-9
+
+# Row, column and box of every cell of a flat 81-cell grid
+ROW_OF = [i // 9 for i in range(81)]
+COL_OF = [i % 9 for i in range(81)]
+BOX_OF = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+
+# Number of candidates and list of candidate digits for every possible mask
+POPCOUNT = [bin(mask).count("1") for mask in range(1 << 10)]
+MASK_DIGITS = [[d for d in range(1, 10) if mask >> d & 1] for mask in range(1 << 10)]
+
+
+def flatten_grid(grid: Grid | list[list[int]] | str) -> list[int]:
+    """
+    Convert a Sudoku grid into a flat list of 81 integers.
+
+    Args:
+    - grid (Grid | list[list[int]] | str): A Grid, a 9x9 grid of numbers or a string of 81 digits (0 or '.' for empty cells).
+
+    Returns:
+    - list[int]: The 81 cells row by row, with 0 for empty cells.
+    """
+    if isinstance(grid, Grid):
+        return list(grid.cells)
+    if isinstance(grid, str):
+        return [0 if cell == "." else int(cell) for cell in grid]
+    return [int(cell) for row in grid for cell in row]
+
+
+def _search(cells: list[int], rows: list[int], cols: list[int], boxes: list[int],
+            empties: list[int], limit: int, found: list[list[int]]) -> None:
+    """
+    Depth-first search with constraint propagation, recording up to `limit` solutions in `found`.
+    """
+    while True:
+        # Fill every cell that has a single candidate, and find the most constrained remaining cell
+        remaining = []
+        best_cell, best_mask, best_count = -1, 0, 10
+        placed = False
+        # For every row, column and box: digits that are candidates at least once / at least twice
+        once, twice = [0] * 27, [0] * 27
+        for i in empties:
+            r, c, b = ROW_OF[i], COL_OF[i], BOX_OF[i]
+            mask = ALL_DIGITS & ~(rows[r] | cols[c] | boxes[b])
+            count = POPCOUNT[mask]
+            if count == 0:
+                return  # Dead end: this cell has no possible digit
+            if count == 1:
+                cells[i] = MASK_DIGITS[mask][0]
+                rows[r] |= mask
+                cols[c] |= mask
+                boxes[b] |= mask
+                placed = True
+                continue
+            remaining.append(i)
+            col_unit, box_unit = 9 + c, 18 + b
+            twice[r] |= once[r] & mask
+            twice[col_unit] |= once[col_unit] & mask
+            twice[box_unit] |= once[box_unit] & mask
+            once[r] |= mask
+            once[col_unit] |= mask
+            once[box_unit] |= mask
+            if count < best_count:
+                best_cell, best_mask, best_count = i, mask, count
+        empties = remaining
+        if placed:
+            continue
+
+        # Hidden singles: a digit that fits in only one cell of a row, column or box goes there
+        filled = rows + cols + boxes
+        for unit in range(27):
+            if (filled[unit] | once[unit]) != ALL_DIGITS:
+                return  # Dead end: some digit has no place left in this unit
+        for i in empties:
+            r, c, b = ROW_OF[i], COL_OF[i], BOX_OF[i]
+            mask = ALL_DIGITS & ~(rows[r] | cols[c] | boxes[b])
+            hidden = mask & ((once[r] & ~twice[r]) | (once[9 + c] & ~twice[9 + c]) | (once[18 + b] & ~twice[18 + b]))
+            if hidden:
+                if POPCOUNT[hidden] > 1:
+                    return  # Dead end: this cell is the only place for two different digits
+                cells[i] = MASK_DIGITS[hidden][0]
+                rows[r] |= hidden
+                cols[c] |= hidden
+                boxes[b] |= hidden
+                placed = True
+        if not placed:
+            break
+        empties = [i for i in empties if not cells[i]]
+
+    if not empties:
+        found.append(cells)  # Every cell is filled: this is a solution
+        return
+
+    # Branch on the cell with the fewest candidates (MRV)
+    r, c, b = ROW_OF[best_cell], COL_OF[best_cell], BOX_OF[best_cell]
+    empties.remove(best_cell)
+    for digit in MASK_DIGITS[best_mask]:
+        bit = 1 << digit
+        new_cells = cells[:]
+        new_cells[best_cell] = digit
+        new_rows, new_cols, new_boxes = rows[:], cols[:], boxes[:]
+        new_rows[r] |= bit
+        new_cols[c] |= bit
+        new_boxes[b] |= bit
+        _search(new_cells, new_rows, new_cols, new_boxes, empties, limit, found)
+        if len(found) >= limit:
+            return
+
+
+def solve_sudoku(grid: list[list[int]] | str, limit: int = 2) -> tuple[list[list[int]] | None, int]:
+    """
+    Solve a Sudoku grid and count its solutions, stopping as soon as `limit` solutions are found.
+
+    Args:
+    - grid (list[list[int]] | str): The unsolved grid, as a 9x9 list or a string of 81 digits.
+    - limit (int): The number of solutions after which the search stops (2 is enough to tell
+      a unique puzzle from an ambiguous one).
+
+    Returns:
+    - tuple: The first solution found as a 9x9 list of lists (None if there is none)
+      and the number of solutions found (0, 1, ... up to `limit`).
+    """
+    cells = flatten_grid(grid)
+    if len(cells) != 81:
+        return None, 0
+
+    # Build the row, column and box masks, rejecting givens that clash with each other
+    rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+    empties = []
+    for i, digit in enumerate(cells):
+        if digit == 0:
+            empties.append(i)
+            continue
+        bit = 1 << digit
+        r, c, b = ROW_OF[i], COL_OF[i], BOX_OF[i]
+        if not 1 <= digit <= 9 or (rows[r] | cols[c] | boxes[b]) & bit:
+            return None, 0
+        rows[r] |= bit
+        cols[c] |= bit
+        boxes[b] |= bit
+
+    found = []
+    _search(cells, rows, cols, boxes, empties, limit, found)
+    if not found:
+        return None, 0
+    solution = found[0]
+    return [solution[i:i+9] for i in range(0, 81, 9)], len(found)
+
+
+def count_solutions(grid: list[list[int]] | str, limit: int = 2) -> int:
+    """
+    Count the solutions of a Sudoku grid, up to `limit`.
+
+    Args:
+    - grid (list[list[int]] | str): The unsolved grid.
+    - limit (int): The number of solutions after which counting stops.
+
+    Returns:
+    - int: 0 if the grid has no solution, 1 if it is unique, `limit` if it has at least that many.
+    """
+    return solve_sudoku(grid, limit)[1]
+
+
+def solve_many(grids: list, limit: int = 2) -> list[tuple[list[list[int]] | None, int]]:
+    """
+    Solve a batch of Sudoku grids.
+
+    Args:
+    - grids (list): The unsolved grids, each as a 9x9 list or a string of 81 digits.
+    - limit (int): The number of solutions after which the search stops for each grid.
+
+    Returns:
+    - list[tuple]: One (solution, solution count) pair per grid, as returned by solve_sudoku.
+    """
+    return [solve_sudoku(grid, limit) for grid in grids]
+
+
+def verify_seed_pairs(pairs: list) -> list[bool]:
+    """
+    Check a batch of (unsolved, solved) seed pairs.
+
+    Args:
+    - pairs (list): Pairs of grids, each as a 9x9 list or a string of 81 digits.
+
+    Returns:
+    - list[bool]: True for every pair whose unsolved grid has exactly one solution, equal to the solved grid.
+    """
+    results = []
+    for unsolved, solved in pairs:
+        solution, count = solve_sudoku(unsolved)
+        results.append(count == 1 and flatten_grid(solution) == flatten_grid(solved))
+    return results
@@ -0,0 +1,378 @@
+import itertools
+import numpy as np
+
+# Every validity-preserving Sudoku transformation is a combination of:
+# - a relabeling of the digits 1-9 (9! choices)
+# - an optional transposition (2 choices)
+# - a row arrangement: an order of the 3 bands and an order of the rows inside each band (3!^4 choices)
+# - a column arrangement: an order of the 3 stacks and an order of the columns inside each stack (3!^4 choices)
+# Each group element is encoded as one integer:
+#   code = ((relabeling * 2 + transpose) * LINE_ARRANGEMENTS + rows) * LINE_ARRANGEMENTS + columns
+RELABELINGS = 362880  # 9!
+TRANSPOSITIONS = 2
+LINE_ARRANGEMENTS = 6 ** 4  # (3!)^4, band order plus one order per band
+GROUP_ORDER = RELABELINGS * TRANSPOSITIONS * LINE_ARRANGEMENTS * LINE_ARRANGEMENTS
+
+# FACTORIALS[k] = k!, the place values of the relabeling index written in the factorial number system
+FACTORIALS = [1, 1, 2, 6, 24, 120, 720, 5040, 40320]
+
+# The six orders of three items, in lexicographic order
+PERMUTATIONS_3 = np.array(list(itertools.permutations(range(3))), dtype=np.int64)
+
+# TRANSPOSE_INDEX[t] gives, for every cell, the flat source index after an optional transposition
+TRANSPOSE_INDEX = np.stack([np.arange(81), np.arange(81).reshape(9, 9).T.ravel()])
+
+
+def build_line_arrangements() -> np.ndarray:
+    """
+    Build the table of every row (or column) arrangement allowed inside a Sudoku grid.
+
+    Returns:
+    - np.ndarray: A (1296, 9) array where row a lists, for each final line, the source line it comes from.
+    """
+    # Split every arrangement code into the band order and the three in-band orders (base 6 digits)
+    codes = np.arange(LINE_ARRANGEMENTS)
+    band_order = PERMUTATIONS_3[codes // 216]
+    inner_orders = np.stack([PERMUTATIONS_3[(codes // 6 ** k) % 6] for k in (2, 1, 0)], axis=1)
+
+    # Final line r sits in final band r // 3, which comes from source band band_order[r // 3],
+    # and inside it takes the line given by that band's own order
+    lines = np.arange(9)
+    return 3 * band_order[:, lines // 3] + inner_orders[:, lines // 3, lines % 3]
+
+
+# LINE_SOURCES[a] lists the source line of every final line for arrangement a;
+# ROW_OFFSETS is the same table pre-multiplied by 9 so a cell index is a single addition
+LINE_SOURCES = build_line_arrangements()
+ROW_OFFSETS = LINE_SOURCES * 9
+
+# PATTERN_WEIGHTS[c, a] is the bit that source column c gets in a row's pattern of filled cells
+# (first final column = highest bit) under column arrangement a, so one product gives the row
+# patterns of a grid under all 1296 arrangements
+PATTERN_WEIGHTS = np.zeros((9, LINE_ARRANGEMENTS), dtype=np.int64)
+np.put_along_axis(PATTERN_WEIGHTS, LINE_SOURCES.T, 1 << np.arange(8, -1, -1, dtype=np.int64)[:, None], axis=0)
+
+
+def relabeling_unrank(ranks) -> np.ndarray:
+    """
+    Build the digit relabelings with the given indices, without listing all 9! of them.
+
+    Args:
+    - ranks (array): An (n,) array of relabeling indices (0 to 9! - 1).
+
+    Returns:
+    - np.ndarray: An (n, 10) uint8 array; row k maps each digit to its new value, with 0 kept as 0.
+      Index k is the lexicographic rank of the relabeling among all permutations of 1-9.
+    """
+    ranks = np.array(ranks, dtype=np.int64).ravel()
+    n = len(ranks)
+    table = np.zeros((n, 10), dtype=np.uint8)
+    remaining = np.tile(np.arange(1, 10, dtype=np.uint8), (n, 1))
+    rows = np.arange(n)
+    # Each factorial digit of the rank picks one of the values not used yet, smallest first
+    for digit in range(1, 10):
+        picks, ranks = np.divmod(ranks, FACTORIALS[9 - digit])
+        table[:, digit] = remaining[rows, picks]
+        keep = np.ones(remaining.shape, dtype=bool)
+        keep[rows, picks] = False
+        remaining = remaining[keep].reshape(n, 9 - digit)
+    return table
+
+
+def encode_elements(relabeling, transpose, rows, columns) -> np.ndarray:
+    """
+    Pack the parts of one or more group elements into integer codes.
+
+    Args:
+    - relabeling (int or array): Index of the digit relabeling (0 to 9! - 1).
+    - transpose (int or array): 1 to transpose the grid, 0 otherwise.
+    - rows (int or array): Index of the row arrangement (0 to 1295).
+    - columns (int or array): Index of the column arrangement (0 to 1295).
+
+    Returns:
+    - np.ndarray: The int64 codes of the group elements.
+    """
+    relabeling, transpose, rows, columns = (np.asarray(part, dtype=np.int64) for part in (relabeling, transpose, rows, columns))
+    return ((relabeling * TRANSPOSITIONS + transpose) * LINE_ARRANGEMENTS + rows) * LINE_ARRANGEMENTS + columns
+
+
+def decode_elements(codes) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split group element codes back into their parts.
+
+    Args:
+    - codes (int or array): Codes produced by encode_elements or random_elements.
+
+    Returns:
+    - tuple: The relabeling, transpose, row arrangement and column arrangement indices.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    codes, columns = np.divmod(codes, LINE_ARRANGEMENTS)
+    codes, rows = np.divmod(codes, LINE_ARRANGEMENTS)
+    relabeling, transpose = np.divmod(codes, TRANSPOSITIONS)
+    return relabeling, transpose, rows, columns
+
+
+def random_elements(rng: np.random.Generator, n: int) -> np.ndarray:
+    """
+    Draw n group elements uniformly at random.
+
+    Args:
+    - rng (np.random.Generator): The random generator to draw from.
+    - n (int): The number of elements.
+
+    Returns:
+    - np.ndarray: An (n,) int64 array of group element codes.
+    """
+    return rng.integers(0, GROUP_ORDER, size=n, dtype=np.int64)
+
+
+def gather_indices(codes) -> np.ndarray:
+    """
+    Turn group elements into the cell permutation they apply.
+
+    Args:
+    - codes (array): An (n,) array of group element codes.
+
+    Returns:
+    - np.ndarray: An (n, 81) array; transformed[i] = grid[indices[i]] moves the cells of a flat grid.
+    """
+    _, transpose, rows, columns = decode_elements(codes)
+    # Cell (r, c) of the result comes from cell (row source, column source) of the transposed grid
+    cells = (ROW_OFFSETS[rows][:, :, None] + LINE_SOURCES[columns][:, None, :]).reshape(len(transpose), 81)
+    return np.take_along_axis(TRANSPOSE_INDEX[transpose], cells, axis=1)
+
+
+def relabel_tables(codes) -> np.ndarray:
+    """
+    Turn group elements into the digit relabeling they apply.
+
+    Args:
+    - codes (array): An (n,) array of group element codes.
+
+    Returns:
+    - np.ndarray: An (n, 10) uint8 array; each row maps a digit to its new value, keeping 0 as 0.
+    """
+    relabeling, _, _, _ = decode_elements(codes)
+    return relabeling_unrank(relabeling)
+
+
+def apply_elements(codes, grids: np.ndarray) -> np.ndarray:
+    """
+    Apply group elements to flat grids.
+
+    Args:
+    - codes (array): An (n,) array of group element codes.
+    - grids (np.ndarray): Either one flat grid of 81 values 0-9 (transformed n times)
+      or an (n, 81) array with one grid per element.
+
+    Returns:
+    - np.ndarray: An (n, 81) uint8 array of transformed grids.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    indices = gather_indices(codes)
+    tables = relabel_tables(codes)
+    grids = np.asarray(grids, dtype=np.uint8)
+
+    # Move the cells with one gather, then relabel them with a second one
+    if grids.ndim == 1:
+        moved = grids[indices]
+    else:
+        moved = np.take_along_axis(grids, indices, axis=1)
+    return np.take_along_axis(tables, moved.astype(np.intp), axis=1)
+
+
+def undo_elements(codes, grids: np.ndarray) -> np.ndarray:
+    """
+    Apply the inverse of group elements to flat grids, so that undo_elements(codes, apply_elements(codes, grids)) == grids.
+
+    Args:
+    - codes (array): An (n,) array of group element codes.
+    - grids (np.ndarray): Either one flat grid of 81 values 0-9 or an (n, 81) array with one grid per element.
+
+    Returns:
+    - np.ndarray: An (n, 81) uint8 array of grids in their original frame.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    indices = gather_indices(codes)
+    tables = relabel_tables(codes)
+    grids = np.broadcast_to(np.asarray(grids, dtype=np.uint8), indices.shape)
+
+    # Invert the relabeling (table[d] = new digit, so inverse[new digit] = d), then scatter the cells back
+    inverse_tables = np.zeros_like(tables)
+    np.put_along_axis(inverse_tables, tables.astype(np.intp), np.arange(10, dtype=np.uint8)[None, :], axis=1)
+    relabeled = np.take_along_axis(inverse_tables, grids.astype(np.intp), axis=1)
+    restored = np.empty_like(relabeled)
+    np.put_along_axis(restored, indices, relabeled, axis=1)
+    return restored
+
+
+# Index of every line arrangement in LINE_SOURCES, looked up from its tuple of source lines
+LINE_ARRANGEMENT_INDEX = {tuple(sources): index for index, sources in enumerate(LINE_SOURCES.tolist())}
+
+
+def relabeling_rank(mapping: list[int]) -> int:
+    """
+    Find the index of a relabeling, the inverse of relabeling_unrank.
+
+    Args:
+    - mapping (list[int]): The new value of each digit 1-9, in order.
+
+    Returns:
+    - int: The lexicographic rank of the relabeling among all permutations of 1-9.
+    """
+    rank = 0
+    for i, value in enumerate(mapping):
+        smaller_after = sum(1 for later in mapping[i + 1:] if later < value)
+        rank += smaller_after * FACTORIALS[8 - i]
+    return rank
+
+
+def canonical_form(grid) -> tuple[np.ndarray, int]:
+    """
+    Find the canonical representative of a grid under the Sudoku symmetry group.
+
+    The canonical form is the smallest 81-digit string (compared row by row) among all transformed
+    grids, where digits are renamed 1, 2, 3... in order of first appearance. Two grids have the same
+    canonical form exactly when one is a transformation of the other, so it can be used as a key for
+    anything that does not change under the group (solution count, difficulty...).
+
+    The search builds the result one row at a time: every (transposition, column arrangement,
+    source row) combination is tried for the first row, only the candidates giving the smallest
+    row are kept, and the survivors are extended with the rows allowed by the band structure.
+    Real puzzles keep very few candidates alive; nearly empty grids have many ties and are slow.
+
+    Args:
+    - grid (array-like): A flat grid of 81 values 0-9.
+
+    Returns:
+    - tuple: The canonical grid as an (81,) uint8 array, and the code of a group element
+      taking `grid` to it (apply_elements([code], grid)[0] equals the canonical grid).
+    """
+    grid = np.asarray(grid, dtype=np.intp).reshape(81)
+
+    # Every transposition and column arrangement, as (2 * 1296, 9, 9) grids whose rows are still to be ordered
+    transposed = grid[TRANSPOSE_INDEX].reshape(2, 9, 9)
+    arranged = transposed[:, :, LINE_SOURCES].transpose(0, 2, 1, 3).reshape(-1, 9, 9)
+
+    # Inside a single row digits are distinct, so the renamed first row is fully decided by where its
+    # empty cells are: keep the (layout, source row) pairs whose first row has the smallest zero pattern
+    patterns = (arranged > 0).astype(np.int64) @ (1 << np.arange(8, -1, -1, dtype=np.int64))
+    layout, first_row = np.nonzero(patterns == patterns.min())
+
+    # Candidate state: layout, chosen source rows and digit renaming so far (-1 = digit not seen yet)
+    count = len(layout)
+    chosen = first_row[:, None]
+    mapping = np.full((count, 10), -1, dtype=np.intp)
+    mapping[:, 0] = 0
+    next_label = np.ones(count, dtype=np.intp)
+    powers = 10 ** np.arange(8, -1, -1, dtype=np.int64)
+    result = []
+
+    for position in range(9):
+        # Rename the digits of the candidate row in order of first appearance
+        rows = arranged[layout, chosen[:, -1]]
+        labels = np.empty_like(rows)
+        candidates = np.arange(len(rows))
+        for column in range(9):
+            digits = rows[:, column]
+            unseen = mapping[candidates, digits] < 0
+            mapping[candidates[unseen], digits[unseen]] = next_label[unseen]
+            next_label += unseen
+            labels[:, column] = mapping[candidates, digits]
+
+        # Keep only the candidates producing the smallest row
+        keys = labels.astype(np.int64) @ powers
+        best = keys == keys.min()
+        layout, chosen, mapping, next_label = layout[best], chosen[best], mapping[best], next_label[best]
+        result.append(labels[best][0])
+        if position == 8:
+            break
+
+        # Extend with the rows allowed next: the rest of the current band, or the first row of an unused band
+        used = np.zeros((len(layout), 9), dtype=bool)
+        np.put_along_axis(used, chosen, True, axis=1)
+        if (position + 1) % 3:
+            allowed = (np.arange(9)[None, :] // 3 == chosen[:, -1:] // 3) & ~used
+        else:
+            used_bands = used.reshape(-1, 3, 3).any(axis=2)
+            allowed = ~np.repeat(used_bands, 3, axis=1)
+        parent, next_row = np.nonzero(allowed)
+        layout, mapping, next_label = layout[parent], mapping[parent], next_label[parent]
+        chosen = np.hstack([chosen[parent], next_row[:, None]])
+
+    # Rebuild the group element of the first surviving candidate, naming unseen digits last
+    transpose, columns = divmod(int(layout[0]), LINE_ARRANGEMENTS)
+    rows = LINE_ARRANGEMENT_INDEX[tuple(chosen[0].tolist())]
+    renaming = mapping[0].tolist()
+    label = int(next_label[0])
+    for digit in range(1, 10):
+        if renaming[digit] < 0:
+            renaming[digit] = label
+            label += 1
+    code = int(encode_elements(relabeling_rank(renaming[1:]), transpose, rows, columns))
+    return np.concatenate(result).astype(np.uint8), code
+
+
+def find_element(grid, target, block: int = 4096) -> int | None:
+    """
+    Find a group element taking one grid to another, if there is one.
+
+    Only the transformations that move the given cells of `grid` onto the given cells of `target`
+    are considered: column arrangements are kept when they produce the same multiset of row
+    patterns (which cells are filled), row arrangements when they then line up every row pattern,
+    and the survivors are checked for a digit relabeling consistent with every given.
+
+    Args:
+    - grid (array-like): A flat grid of 81 values 0-9.
+    - target (array-like): Another flat grid of 81 values 0-9.
+    - block (int): The number of candidate grids checked at a time.
+
+    Returns:
+    - int | None: The code of an element with apply_elements([code], grid)[0] equal to `target`,
+      or None when the grids are not symmetric to each other.
+    """
+    grid = np.asarray(grid, dtype=np.intp).reshape(81)
+    target = np.asarray(target, dtype=np.intp).reshape(81)
+    if np.count_nonzero(grid) != np.count_nonzero(target):
+        return None
+    target_patterns = (target.reshape(9, 9) > 0).astype(np.int64) @ PATTERN_WEIGHTS[:, 0]
+    sorted_target = np.sort(target_patterns)
+    filled = target > 0
+    wanted = target[filled]
+    digit_count = len(np.unique(wanted))
+    if len(np.unique(grid[grid > 0])) != digit_count:
+        return None
+
+    for transpose in range(TRANSPOSITIONS):
+        moved = grid[TRANSPOSE_INDEX[transpose]].reshape(9, 9)
+        # (1296, 9) row patterns, one row per column arrangement
+        patterns = ((moved > 0).astype(np.int64) @ PATTERN_WEIGHTS).T
+        # Cheap sums first, then the exact multiset of row patterns on the few arrangements left
+        columns = np.flatnonzero((patterns.sum(axis=1) == sorted_target.sum())
+                                 & ((patterns * patterns).sum(axis=1) == (sorted_target * sorted_target).sum()))
+        columns = columns[(np.sort(patterns[columns], axis=1) == sorted_target).all(axis=1)]
+        if not len(columns):
+            continue
+        # Row arrangements lining up every row pattern, for each surviving column arrangement
+        column_index, rows = np.nonzero((patterns[columns][:, LINE_SOURCES] == target_patterns).all(axis=2))
+        column_index = columns[column_index]
+
+        for start in range(0, len(rows), block):
+            layouts, orders = column_index[start:start + block], rows[start:start + block]
+            candidates = moved[LINE_SOURCES[orders][:, :, None], LINE_SOURCES[layouts][:, None, :]].reshape(-1, 81)
+            # A relabeling exists when every digit of the candidate always lands on the same target digit
+            givens = candidates[:, filled]
+            tables = np.zeros((len(givens), 10), dtype=np.intp)
+            np.put_along_axis(tables, givens, wanted[None, :], axis=1)
+            consistent = np.flatnonzero((np.take_along_axis(tables, givens, axis=1) == wanted).all(axis=1))
+            if not len(consistent):
+                continue
+
+            # Complete the relabeling with the digits neither grid uses, in order
+            found = consistent[0]
+            mapping = tables[found].tolist()
+            free = [digit for digit in range(1, 10) if digit not in mapping[1:]]
+            mapping = [value if value else free.pop(0) for value in mapping[1:]]
+            return int(encode_elements(relabeling_rank(mapping), transpose, orders[found], layouts[found]))
+    return None
@@ -0,0 +1,15 @@
+import numpy as np
+from DifficultyGrader import grade_puzzle
+from RunBatch import load_seed_library
+from SudokuSolver import flatten_grid
+from SymmetryGroup import apply_elements, random_elements
+
+
+def test_rating_is_invariant_under_the_symmetry_group():
+    # Symmetric copies of a puzzle need the same techniques, so they must get the same rating and bucket
+    rng = np.random.default_rng(0)
+    for seed in load_seed_library("SampleGrids.txt"):
+        grid = np.array(flatten_grid(seed["unsolved"]), dtype=np.uint8)
+        expected = grade_puzzle("".join(map(str, grid)))
+        for variant in apply_elements(random_elements(rng, 50), grid):
+            assert grade_puzzle("".join(map(str, variant))) == expected